@@ -8,9 +8,10 @@ os.environ['SDL_AUDIODRIVER'] = 'dummy'
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                          QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                          QStackedWidget, QMessageBox, QDialog)
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject
+from PyQt6.QtCore import Qt, pyqtSignal, QObject
 from PyQt6.QtGui import QPalette, QColor
 from radio import MumbleRadioClient
+from simvars import COM1_ACTIVE
 import threading
 import time
 import keyboard
@@ -89,15 +90,19 @@ class LoginWindow(QWidget):
         self.error_label.setText("")
 
 class MainWindow(QWidget):
+    # SimVar推送在SimConnect线程中到达，通过信号转到界面线程更新
+    frequency_changed = pyqtSignal(float)
+
     def __init__(self, radio_client, parent=None):
         super().__init__(parent)
         self.radio_client = radio_client
         self.setup_ui()
         
-        # 设置定时器更新COM1频率
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frequency)
-        self.timer.start(1000)  # 每秒更新一次
+        # 订阅COM1频率，变化时更新显示
+        self.frequency_changed.connect(self.update_frequency)
+        self.frequency_subscription = self.radio_client.simvars.subscribe(
+            COM1_ACTIVE, self.frequency_changed.emit)
+        self.destroyed.connect(lambda: self.radio_client.simvars.unsubscribe(self.frequency_subscription))
         
         # 连接设置按钮
         self.settings_button.clicked.connect(self.show_settings)
@@ -126,12 +131,11 @@ class MainWindow(QWidget):
         
         self.setLayout(layout)
 
-    def update_frequency(self):
-        try:
-            freq = self.radio_client.aq.get("COM_ACTIVE_FREQUENCY:1")
-            self.freq_label.setText(f"COM1: {freq:.3f} MHz")
-        except:
+    def update_frequency(self, freq=None):
+        if freq is None:
             self.freq_label.setText("COM1: -.--- MHz")
+        else:
+            self.freq_label.setText(f"COM1: {freq:.3f} MHz")
 
     def update_ptt_status(self, is_talking):
         self.ptt_indicator.setActive(is_talking)
@@ -142,6 +146,8 @@ class MainWindow(QWidget):
         if dialog.exec() == QDialog.DialogCode.Accepted:
             # 更新音量设置并重新初始化音频设备
             self.radio_client.reinitialize_audio()  # 重新初始化音频设备
+        # 设置对话框关闭时会清除所有键盘钩子，且PTT按键可能已更改
+        self.radio_client.register_ptt_hooks()
 
 class ErrorSignal(QObject):
     error = pyqtSignal(str)
@@ -15,7 +15,7 @@ qt_binaries, qt_datas, qt_hiddenimports = collect_all('PyQt6')
 
 a = Analysis(
     ['gui.py'],  # 更改为gui.py
-    pathex=[],
+    pathex=['..'],  # 仓库根目录，包含共用的common包
     binaries=[
         (simconnect_dll, 'SimConnect')
     ] + qt_binaries,
@@ -1,6 +1,9 @@
 import os
+import sys
 os.environ['SDL_VIDEODRIVER'] = 'dummy'
 os.environ['SDL_AUDIODRIVER'] = 'dummy'
+# 与管制员客户端共用的音频模块在仓库根目录的common包中
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from SimConnect import *
 import pymumble_py3 as pymumble
@@ -9,10 +12,14 @@ import time
 import keyboard
 import pyaudio
 import wave
-import numpy as np  # 确保numpy被导入
-import sys
 import functools
 import pygame  # pygame导入必须在设置环境变量之后
+from common.mixer import Mixer
+from ringbuffer import RingBuffer
+from common.dsp import DspChain, GainKernel, NoiseGate, SoftLimiter, VAD
+from common.uplink import install_uplink
+from simvars import COM1_ACTIVE, SimConnectSubscription
+from collections import deque
 
 # 配置服务器信息
 SERVER_HOST = "118.153.226.153"  # Mumble服务器地址
@@ -31,10 +38,15 @@ def suppress_mumble_errors(func):
     return wrapper
 
 class MumbleRadioClient:
-    def __init__(self, server_host, username, password="", settings=None):
-        # SimConnect 初始化
-        self.simconnect = SimConnect()
-        self.aq = AircraftRequests(self.simconnect, _time=2000)
+    def __init__(self, server_host, username, password="", settings=None, simvars=None):
+        # SimConnect 初始化：COM1频率由模拟器在变化时推送，监控线程和界面都订阅同一份数据；
+        # 测试时可传入simvars（例如simvars.ReplaySimVars）代替模拟器
+        if simvars is None:
+            self.simconnect = SimConnect()
+            self.simvars = SimConnectSubscription(self.simconnect).start()
+        else:
+            self.simconnect = None
+            self.simvars = simvars.start()
         
         # 音频配置
         self.CHUNK = 960  # 20ms @ 48000Hz
@@ -43,6 +55,11 @@ class MumbleRadioClient:
         self.RATE = 48000
         self.is_talking = False
         self.on_ptt_change = None
+        self.ptt_event = threading.Event()  # PTT按下时置位，语音线程据此开始发送
+        self._link_changed = threading.Event()  # PTT松开、连接或频道变化时置位，唤醒等待就绪的语音线程
+        self._ptt_sources = {}  # 各PTT来源（键盘、摇杆）当前是否按下
+        self._ptt_lock = threading.Lock()
+        self._ptt_hooks = []
         
         # 添加设置支持（改为可注入同一份 Settings）
         if settings is not None:
@@ -60,25 +77,26 @@ class MumbleRadioClient:
         # 确保音量在合理范围内
         self.settings.mic_volume = max(0, min(200, self.settings.mic_volume))
         self.settings.speaker_volume = max(0, min(200, self.settings.speaker_volume))
+        self.settings.jitter_robustness = max(0, min(100, self.settings.jitter_robustness))
+        self.settings.ptt_preroll = max(0, min(500, self.settings.ptt_preroll))
         
         # 初始化音频设备
         self.audio = pyaudio.PyAudio()
-        self.stream = self.audio.open(
-            format=self.FORMAT,
-            channels=self.CHANNELS,
-            rate=self.RATE,
-            input=True,
-            frames_per_buffer=self.CHUNK,
-            input_device_index=self.settings.input_device_index
-        )
-        self.output_stream = self.audio.open(
-            format=self.FORMAT,
-            channels=self.CHANNELS,
-            rate=self.RATE,
-            output=True,
-            frames_per_buffer=self.CHUNK,
-            output_device_index=self.settings.output_device_index
-        )
+        # 采集在声卡回调中进行：PTT按下时写入环形缓冲区，松开时只保留预录部分
+        self.capture_buffer = RingBuffer(self.RATE * 2)  # int16单声道，容量1秒
+        self._preroll = deque(maxlen=0)  # 打开输入流时按设置的预录时长调整
+        self._capture_ready = threading.Event()
+        self._capture_frame = bytearray(self.CHUNK * 2 * self.CHANNELS)
+        # 麦克风：音量、语音检测、噪声门、软限幅；扬声器：音量、软限幅。音量只在这里调整
+        self.mic_gain = GainKernel(self.settings.mic_volume / 100.0)
+        self.mic_vad = VAD()  # PTT按下期间只发送检测到语音的帧
+        self.mic_chain = DspChain([self.mic_gain, self.mic_vad, NoiseGate(), SoftLimiter()], self.CHUNK)
+        self.speaker_gain = GainKernel(self.settings.speaker_volume / 100.0)
+        self.speaker_chain = DspChain([self.speaker_gain, SoftLimiter()], self.CHUNK)
+        self.stream = self.open_input_stream()
+        # 接收的音频按用户写入混音器，由声卡回调混合后播放
+        self.mixer = Mixer(self.RATE, robustness=self.settings.jitter_robustness / 100.0)
+        self.output_stream = self.open_output_stream()
 
         # 初始化 Mumble 客户端
         self.mumble = pymumble.Mumble(
@@ -88,8 +106,11 @@ class MumbleRadioClient:
             reconnect=True
         )
         
+        # 发送结束时补发带结束标志的帧，接收端不用等超时
+        install_uplink(self.mumble)
         self.mumble.set_receive_sound(True)
         self.mumble.callbacks.set_callback(pymumble.constants.PYMUMBLE_CLBK_SOUNDRECEIVED, self.handle_incoming_audio)
+        self.mumble.callbacks.set_callback(pymumble.constants.PYMUMBLE_CLBK_USERREMOVED, self.handle_user_removed)
         self.current_channel = None
         
         # 初始应用音量设置
@@ -98,6 +119,7 @@ class MumbleRadioClient:
         # 线程管理
         self.monitor_thread = None
         self.voice_thread = None
+        self.joystick_thread = None
         self.running = True
 
         self.pygame_lock = threading.Lock()  # 添加pygame锁
@@ -124,6 +146,50 @@ class MumbleRadioClient:
             self.pygame_initialized = False
             self.joystick = None
 
+    def open_input_stream(self):
+        """以回调模式打开输入流，声卡线程把采集到的音频交给环形缓冲区"""
+        self.capture_buffer.clear()
+        # 声卡回调每次送来一个CHUNK，预录缓冲按设置的时长保留最近的若干帧
+        self._preroll = deque(maxlen=round(self.settings.ptt_preroll * self.RATE / 1000 / self.CHUNK))
+        return self.audio.open(
+            format=self.FORMAT,
+            channels=self.CHANNELS,
+            rate=self.RATE,
+            input=True,
+            frames_per_buffer=self.CHUNK,
+            input_device_index=self.settings.input_device_index,
+            stream_callback=self._capture_callback
+        )
+
+    def _capture_callback(self, in_data, frame_count, time_info, status):
+        """声卡回调：PTT按下时写入环形缓冲区，否则只保留最近的预录音频"""
+        if self.is_talking:
+            self.capture_buffer.write(in_data)
+            self._capture_ready.set()
+        elif self._preroll.maxlen:
+            self._preroll.append(in_data)
+        return (None, pyaudio.paContinue)
+
+    def open_output_stream(self):
+        """以回调模式打开输出流，声卡线程从混音器取数据"""
+        return self.audio.open(
+            format=self.FORMAT,
+            channels=self.CHANNELS,
+            rate=self.RATE,
+            output=True,
+            frames_per_buffer=self.CHUNK,
+            output_device_index=self.settings.output_device_index,
+            stream_callback=self._playback_callback
+        )
+
+    def _playback_callback(self, in_data, frame_count, time_info, status):
+        """声卡回调：混合所有正在说话的用户，数据不足时补静音"""
+        return (self.speaker_chain.process_array(self.mixer.mix(frame_count)).tobytes(), pyaudio.paContinue)
+
+    def get_playback_stats(self):
+        """返回混音和抖动缓冲区的统计"""
+        return self.mixer.stats()
+
     def convert_frequency(self, frequency):
         """将频率转换为标准格式"""
         return int(round(frequency * 1000))
@@ -146,35 +212,42 @@ class MumbleRadioClient:
         if channel and self.current_channel != channel["channel_id"]:
             self.mumble.users.myself.move_in(channel["channel_id"])
             self.current_channel = channel["channel_id"]
+            self._link_changed.set()
             print(f"已切换到频率: {frequency:.3f} MHz")
     
     def monitor_frequency(self):
-        """监控COM1频率变化"""
+        """监控COM1频率变化：订阅推送唤醒本线程切换频道，不阻塞SimConnect的分发线程"""
         last_frequency = None
-        while self.running:
-            try:
-                if self.mumble.connected:  # 只在连接成功时监控频率
-                    com1_active = self.aq.get("COM_ACTIVE_FREQUENCY:1")
-                    if com1_active is not None and com1_active != last_frequency:
-                        self.switch_channel(com1_active)
-                        last_frequency = com1_active
-            except Exception as e:
-                if self.running:  # 只在正常运行时打印错误
-                    print(f"频率监控错误: {e}")
-            time.sleep(1)  # 增加检查间隔，减少错误日志
+        changed = threading.Event()
+        subscription = self.simvars.subscribe(COM1_ACTIVE, lambda value: changed.set())
+        try:
+            while self.running:
+                try:
+                    if self.mumble.connected:  # 只在连接成功时切换频道
+                        changed.clear()
+                        com1_active = self.simvars.get(COM1_ACTIVE)
+                        if com1_active is not None and com1_active != last_frequency:
+                            self.switch_channel(com1_active)
+                            last_frequency = com1_active
+                except Exception as e:
+                    if self.running:  # 只在正常运行时打印错误
+                        print(f"频率监控错误: {e}")
+                changed.wait(1.0)  # 频率变化时立即唤醒；超时用于连接恢复后重新检查
+        finally:
+            self.simvars.unsubscribe(subscription)
     
     def update_volumes(self):
         """更新麦克风和扬声器音量"""
         try:
-            if self.mumble and self.mumble.connected:
+            if hasattr(self, 'mic_gain'):
                 # 麦克风音量 0-200% 映射到 0-2.0
-                self.mumble.sound_output.volume = self.settings.mic_volume / 100.0
-            if hasattr(self, 'output_stream'):
-                # 扬声器音量 0-200% 映射到音频数据缩放
-                volume_scale = self.settings.speaker_volume / 100.0
-                def volume_modifier(audio_data):
-                    return (np.frombuffer(audio_data, dtype=np.int16) * volume_scale).astype(np.int16).tobytes()
-                self.audio_processor = volume_modifier
+                self.mic_gain.set_gain(self.settings.mic_volume / 100.0)
+            if hasattr(self, 'speaker_gain'):
+                # 扬声器音量 0-200% 映射到播放增益
+                self.speaker_gain.set_gain(self.settings.speaker_volume / 100.0)
+            if hasattr(self, 'mixer'):
+                # 抗抖动程度 0-100% 映射到 0-1.0
+                self.mixer.set_robustness(self.settings.jitter_robustness / 100.0)
         except Exception as e:
             print(f"更新音量设置时出错: {e}")
 
@@ -231,88 +304,142 @@ class MumbleRadioClient:
                 print(f"[DEBUG] 摇杆重新初始化失败: {e}")
                 return False
 
+    def register_ptt_hooks(self):
+        """注册键盘PTT的按下/松开事件（PTT按键变更或设置对话框清除钩子后需重新注册）"""
+        for hook in self._ptt_hooks:
+            try:
+                keyboard.unhook(hook)
+            except (KeyError, ValueError):
+                pass
+        self._ptt_hooks = []
+        self._set_ptt("keyboard", False)
+        try:
+            self._ptt_hooks = [
+                keyboard.on_press_key(self.settings.ptt_key, lambda e: self._set_ptt("keyboard", True)),
+                keyboard.on_release_key(self.settings.ptt_key, lambda e: self._set_ptt("keyboard", False)),
+            ]
+        except Exception as e:
+            print(f"[DEBUG] 注册PTT按键失败: {e}")
+
+    def _set_ptt(self, source, pressed):
+        """PTT边沿事件：合并键盘和摇杆状态，状态改变时通知语音线程"""
+        with self._ptt_lock:
+            self._ptt_sources[source] = bool(pressed)
+            is_speaking = any(self._ptt_sources.values())
+            if is_speaking == self.is_talking:
+                return
+            print(f"[DEBUG] PTT状态改变: {is_speaking} (来源: {source})")
+            self.is_talking = is_speaking
+            if is_speaking:
+                self.ptt_event.set()
+            else:
+                self.ptt_event.clear()
+                self._link_changed.set()
+        if self.on_ptt_change:
+            self.on_ptt_change(self.is_talking)
+
+    def watch_joystick(self):
+        """等待摇杆按键事件，没有事件时阻塞而不是轮询"""
+        print("[DEBUG] 开始摇杆监听线程")
+        while self.running:
+            if self.settings.joystick_ptt is None or not self.joystick:
+                time.sleep(0.5)
+                continue
+            try:
+                if not pygame.get_init() or not pygame.joystick.get_init():
+                    self.ensure_pygame_initialized()
+                # 等待时不持有pygame锁，否则设置界面等其他线程每次都要等满100ms
+                event = pygame.event.wait(100)
+                if event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP) and event.button == self.settings.joystick_ptt:
+                    self._set_ptt("joystick", event.type == pygame.JOYBUTTONDOWN)
+            except Exception as e:
+                print(f"[DEBUG] 摇杆读取错误: {e}")
+                time.sleep(0.1)
+
     def handle_voice(self):
-        """处理按键说话功能"""
+        """处理按键说话功能：PTT以事件方式触发，音频来自回调模式的输入流"""
         print("[DEBUG] 开始语音处理线程")
         self.ensure_pygame_initialized()
-        last_ptt_state = False
-        
+        self.register_ptt_hooks()
+        self.joystick_thread = threading.Thread(target=self.watch_joystick, daemon=True)
+        self.joystick_thread.start()
+
         while self.running:
+            # 阻塞等待PTT按下，超时只用于检查是否退出
+            if not self.ptt_event.wait(0.5):
+                continue
             try:
-                # 检查键盘和摇杆PTT状态
-                keyboard_ptt = keyboard.is_pressed(self.settings.ptt_key)
-                joystick_ptt = False
-                
-                if self.settings.joystick_ptt is not None:
-                    try:
-                        with self.pygame_lock:
-                            if not pygame.get_init() or not pygame.joystick.get_init():
-                                self.ensure_pygame_initialized()
-                            pygame.event.pump()
-                            if (self.joystick and self.joystick.get_init() and 
-                                self.settings.joystick_ptt < self.joystick.get_numbuttons()):
-                                joystick_ptt = self.joystick.get_button(self.settings.joystick_ptt)
-                    except Exception as e:
-                        print(f"[DEBUG] 摇杆读取错误: {e}")
-                
-                is_speaking = keyboard_ptt or joystick_ptt
-                
-                # 状态改变时更新和打印
-                if is_speaking != last_ptt_state:
-                    print(f"[DEBUG] PTT状态改变: {is_speaking} (键盘: {keyboard_ptt}, 摇杆: {joystick_ptt})")
-                    last_ptt_state = is_speaking
-                    self.is_talking = is_speaking
-                    if self.on_ptt_change:
-                        self.on_ptt_change(self.is_talking)
-                
-                # 如果PTT被按下，检查是否可以发送音频
-                if self.is_talking:
-                    if not self.stream or not self.mumble:
-                        print("[DEBUG] 音频发送失败：设备未就绪")
-                        continue
-                    
-                    try:
-                        # 通过检查mumble连接状态和channel来判断是否就绪
-                        if not self.mumble.connected > 0:
-                            print("[DEBUG] Mumble未连接")
-                            continue
-                            
-                        if not self.mumble.channels:
-                            print("[DEBUG] Mumble频道列表为空")
-                            continue
-                            
-                        if not self.mumble.users.myself or not self.mumble.users.myself["channel_id"]:
-                            print("[DEBUG] 未加入任何频道")
-                            continue
-                            
-                        data = self.stream.read(self.CHUNK, exception_on_overflow=False)
-                        if data:
-                            audio_data = np.frombuffer(data, dtype=np.int16)
-                            audio_data = (audio_data * (self.settings.mic_volume / 100.0)).astype(np.int16)
-                            if not any(audio_data):  # 检查是否全是静音
-                                print("[DEBUG] 检测到静音数据")
-                            else:
-                                self.mumble.sound_output.add_sound(audio_data.tobytes())
-                                
-                    except Exception as e:
-                        print(f"[DEBUG] 音频处理错误: {e}")
-                
-                time.sleep(0.01)
+                self._link_changed.clear()
+                if not self._transmit():
+                    # 未连接或不在频道中：等PTT松开、连接或频道变化后再试，不空转
+                    self._link_changed.wait(1.0)
             except Exception as e:
                 print(f"[DEBUG] 语音处理错误: {e}")
                 time.sleep(0.1)
 
+    def _transmit(self):
+        """PTT按下期间，把采集到的音频逐帧发送出去；设备或连接未就绪时返回False"""
+        # 先发送预录部分，之后从环形缓冲区按帧读取
+        # 换入新的deque而不是复制后clear()：声卡回调在两步之间追加的帧不会丢失
+        self._preroll, preroll = deque(maxlen=self._preroll.maxlen), self._preroll
+        self.mic_chain.reset()
+        try:
+            while self.is_talking and self.running:
+                if not self.stream or not self.mumble:
+                    print("[DEBUG] 音频发送失败：设备未就绪")
+                    return False
+                # 通过检查mumble连接状态和channel来判断是否就绪
+                if not self.mumble.connected > 0:
+                    print("[DEBUG] Mumble未连接")
+                    return False
+                if not self.mumble.channels:
+                    print("[DEBUG] Mumble频道列表为空")
+                    return False
+                if not self.mumble.users.myself or not self.mumble.users.myself["channel_id"]:
+                    print("[DEBUG] 未加入任何频道")
+                    return False
+
+                # 逐个取出而不是遍历：已取得旧deque引用的回调仍可能追加一帧
+                while preroll:
+                    self._send_frame(preroll.popleft())
+
+                # 等待采集回调送来新数据
+                self._capture_ready.wait(0.1)
+                self._capture_ready.clear()
+                while self.capture_buffer.available() >= len(self._capture_frame):
+                    self.capture_buffer.read_into(self._capture_frame)
+                    self._send_frame(self._capture_frame)
+            return True
+        finally:
+            # 松开PTT后丢弃剩余不足一帧的数据，下次从按下时的当前帧开始
+            self.capture_buffer.clear()
+            if self.mumble:
+                self.mumble.sound_output.end_transmission()
+
+    def _send_frame(self, data):
+        """经过麦克风处理链后发送一帧音频"""
+        audio_data = self.mic_chain.process(data)
+        if self.mic_vad.speech:
+            # pymumble会保存传入的数据，这里复制一份，处理链的缓冲区下一帧继续复用
+            self.mumble.sound_output.add_sound(bytes(audio_data))
+        else:
+            # 背景噪声不发送；刚从语音转为静音时结束本段发送
+            self.mumble.sound_output.end_transmission()
+
     def handle_incoming_audio(self, user, soundchunk):
         """处理接收到的音频"""
         if user["name"] != self.mumble.users.myself["name"]:  # 不播放自己的声音
             try:
-                # 调整收听音量
-                audio_data = np.frombuffer(soundchunk.pcm, dtype=np.int16)
-                audio_data = (audio_data * (self.settings.speaker_volume / 100.0)).astype(np.int16)
-                self.output_stream.write(audio_data.tobytes())
+                # 回调运行在pymumble的循环线程中，只写入缓冲区，不阻塞在声卡上；
+                # 收听音量在声卡回调中对混音结果统一调整，这里不做处理也不复制数据
+                self.mixer.add(user["session"], soundchunk.sequence, soundchunk.pcm)
             except Exception as e:
                 print(f"音频输出错误: {e}")
 
+    def handle_user_removed(self, user, message):
+        """用户断开时立即丢弃其抖动缓冲区，不等空闲超时"""
+        self.mixer.remove(user["session"])
+
     def reinitialize_audio(self):
         """重新初始化音频设备"""
         try:
@@ -325,22 +452,8 @@ class MumbleRadioClient:
                 self.output_stream.close()
             
             # 重新创建音频流
-            self.stream = self.audio.open(
-                format=self.FORMAT,
-                channels=self.CHANNELS,
-                rate=self.RATE,
-                input=True,
-                frames_per_buffer=self.CHUNK,
-                input_device_index=self.settings.input_device_index
-            )
-            self.output_stream = self.audio.open(
-                format=self.FORMAT,
-                channels=self.CHANNELS,
-                rate=self.RATE,
-                output=True,
-                frames_per_buffer=self.CHUNK,
-                output_device_index=self.settings.output_device_index
-            )
+            self.stream = self.open_input_stream()
+            self.output_stream = self.open_output_stream()
             
             # 更新音量设置
             self.update_volumes()
@@ -356,6 +469,8 @@ class MumbleRadioClient:
         if dialog.exec():
             # 如果用户点击了保存，则重新初始化音频设备
             self.reinitialize_audio()
+        # 设置对话框关闭时会清除所有键盘钩子，且PTT按键可能已更改
+        self.register_ptt_hooks()
 
     @suppress_mumble_errors
     def run(self):
@@ -404,6 +519,8 @@ class MumbleRadioClient:
                     pass
                 self.mumble.stop()
                 
+            if hasattr(self, 'simvars') and self.simvars:
+                self.simvars.stop()
             if hasattr(self, 'simconnect') and self.simconnect:
                 self.simconnect.exit()
                 
@@ -412,6 +529,12 @@ class MumbleRadioClient:
                 self.monitor_thread.join(timeout=1.0)
             if self.voice_thread and self.voice_thread.is_alive():
                 self.voice_thread.join(timeout=1.0)
+            for hook in self._ptt_hooks:
+                try:
+                    keyboard.unhook(hook)
+                except (KeyError, ValueError):
+                    pass
+            self._ptt_hooks = []
                 
             if hasattr(self, 'joystick') and self.joystick:
                 try:
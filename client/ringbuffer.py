@@ -0,0 +1,77 @@
+class RingBuffer:
+    """
+    单生产者单消费者的预分配环形缓冲区
+    生产者只修改写计数，消费者只修改读计数，两端都不加锁；
+    Mumble接收回调只做一次内存复制，声卡回调从这里取数据播放
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._zeros = memoryview(b"")  # 补静音用的全零块，按需增长
+        self._write = 0  # 累计写入字节数，仅由生产者修改
+        self._read = 0  # 累计读取字节数，仅由消费者修改
+        self.overruns = 0  # 缓冲区已满、丢弃新数据的次数
+        self.underruns = 0  # 播放中途数据不足、补静音的次数
+        self.dropped_bytes = 0
+
+    def available(self):
+        """可读取的字节数"""
+        return self._write - self._read
+
+    def write(self, data):
+        """写入数据，空间不足时丢弃放不下的部分，返回实际写入的字节数"""
+        data = memoryview(data).cast("B")
+        size = len(data)
+        free = self.capacity - (self._write - self._read)
+        if size > free:
+            self.overruns += 1
+            self.dropped_bytes += size - free
+            size = free
+        if size <= 0:
+            return 0
+
+        pos = self._write % self.capacity
+        first = min(size, self.capacity - pos)
+        self._view[pos:pos + first] = data[:first]
+        if size > first:
+            self._view[:size - first] = data[first:size]
+        self._write += size
+        return size
+
+    def read_into(self, out):
+        """
+        读取数据填满out（可写的memoryview/bytearray），不足部分补零
+        返回实际读取的字节数
+        """
+        out = memoryview(out).cast("B")
+        wanted = len(out)
+        size = min(wanted, self._write - self._read)
+        if size > 0:
+            pos = self._read % self.capacity
+            first = min(size, self.capacity - pos)
+            out[:first] = self._view[pos:pos + first]
+            if size > first:
+                out[first:size] = self._view[:size - first]
+            self._read += size
+            if size < wanted:
+                self.underruns += 1
+        if size < wanted:
+            if len(self._zeros) < wanted:
+                self._zeros = memoryview(bytes(wanted))
+            out[size:] = self._zeros[:wanted - size]
+        return size
+
+    def clear(self):
+        """丢弃所有未读数据（只应由消费者调用）"""
+        self._read = self._write
+
+    def stats(self, bytes_per_second=96000):
+        """返回缓冲区统计信息"""
+        return {
+            "buffered_ms": self.available() * 1000 / bytes_per_second,
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "dropped_bytes": self.dropped_bytes,
+        }
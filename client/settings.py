@@ -16,6 +16,8 @@ class Settings:
         self.joystick_ptt = None  # 新增摇杆PTT按键属性
         self.mic_volume = 100
         self.speaker_volume = 100
+        self.jitter_robustness = 50  # 接收抖动缓冲：0为最低延迟，100为最强抗抖动
+        self.ptt_preroll = 0  # 按下PTT时附带发送的预录时长（毫秒），0表示从当前帧开始
         self.input_device_index = None
         self.output_device_index = None
         # 新增：账号与密码
@@ -33,6 +35,8 @@ class Settings:
                     self.joystick_ptt = data.get("joystick_ptt", None)
                     self.mic_volume = data.get("mic_volume", 100)
                     self.speaker_volume = data.get("speaker_volume", 100)
+                    self.jitter_robustness = data.get("jitter_robustness", 50)
+                    self.ptt_preroll = data.get("ptt_preroll", 0)
                     self.input_device_index = data.get("input_device_index", None)
                     self.output_device_index = data.get("output_device_index", None)
                     # 新增：读取账号与密码
@@ -53,6 +57,8 @@ class Settings:
                 "joystick_ptt": self.joystick_ptt,
                 "mic_volume": self.mic_volume,
                 "speaker_volume": self.speaker_volume,
+                "jitter_robustness": self.jitter_robustness,
+                "ptt_preroll": self.ptt_preroll,
                 "input_device_index": self.input_device_index,
                 "output_device_index": self.output_device_index,
                 # 新增：保存账号与密码
@@ -148,6 +154,29 @@ class SettingsDialog(QDialog):
         speaker_layout.addWidget(self.speaker_slider)
         speaker_layout.addWidget(self.speaker_value)
 
+        # 接收抖动缓冲设置
+        jitter_layout = QHBoxLayout()
+        jitter_label = QLabel("抗抖动程度:")
+        self.jitter_slider = QSlider(Qt.Orientation.Horizontal)
+        self.jitter_slider.setRange(0, 100)  # 0为最低延迟，100为最强抗抖动
+        self.jitter_slider.setValue(self.settings.jitter_robustness)
+        self.jitter_value = QLabel(f"{self.settings.jitter_robustness}%")
+        jitter_layout.addWidget(jitter_label)
+        jitter_layout.addWidget(self.jitter_slider)
+        jitter_layout.addWidget(self.jitter_value)
+
+        # PTT预录设置
+        preroll_layout = QHBoxLayout()
+        preroll_label = QLabel("PTT预录:")
+        self.preroll_slider = QSlider(Qt.Orientation.Horizontal)
+        self.preroll_slider.setRange(0, 500)  # 毫秒，按20ms一帧取整
+        self.preroll_slider.setSingleStep(20)
+        self.preroll_slider.setValue(self.settings.ptt_preroll)
+        self.preroll_value = QLabel(f"{self.settings.ptt_preroll}ms")
+        preroll_layout.addWidget(preroll_label)
+        preroll_layout.addWidget(self.preroll_slider)
+        preroll_layout.addWidget(self.preroll_value)
+
         # 按钮
         button_layout = QHBoxLayout()
         save_button = QPushButton("保存")
@@ -160,6 +189,10 @@ class SettingsDialog(QDialog):
             lambda v: self.mic_value.setText(f"{v}%"))
         self.speaker_slider.valueChanged.connect(
             lambda v: self.speaker_value.setText(f"{v}%"))
+        self.jitter_slider.valueChanged.connect(
+            lambda v: self.jitter_value.setText(f"{v}%"))
+        self.preroll_slider.valueChanged.connect(
+            lambda v: self.preroll_value.setText(f"{v}ms"))
         save_button.clicked.connect(self.save_and_close)
         cancel_button.clicked.connect(self.reject)
 
@@ -170,6 +203,8 @@ class SettingsDialog(QDialog):
         layout.addLayout(output_layout)
         layout.addLayout(mic_layout)
         layout.addLayout(speaker_layout)
+        layout.addLayout(jitter_layout)
+        layout.addLayout(preroll_layout)
         layout.addLayout(button_layout)
         self.setLayout(layout)
 
@@ -358,6 +393,8 @@ class SettingsDialog(QDialog):
                     self.settings.joystick_ptt = None
             self.settings.mic_volume = self.mic_slider.value()
             self.settings.speaker_volume = self.speaker_slider.value()
+            self.settings.jitter_robustness = self.jitter_slider.value()
+            self.settings.ptt_preroll = self.preroll_slider.value()
             self.settings.input_device_index = self.input_combo.currentData()
             self.settings.output_device_index = self.output_combo.currentData()
             
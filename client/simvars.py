@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import namedtuple
+
+# name: 订阅和查询时使用的名字；simvar/unit: SimConnect中的变量名和单位；
+# epsilon: 变化小于该值时模拟器不推送
+SimVar = namedtuple("SimVar", ["name", "simvar", "unit", "epsilon"])
+
+COM1_ACTIVE = "COM_ACTIVE_FREQUENCY:1"
+DEFAULT_VARIABLES = (
+    SimVar(COM1_ACTIVE, "COM ACTIVE FREQUENCY:1", "MHz", 0.001),  # 频率间隔最小5kHz
+)
+
+
+class SimVarService:
+    """
+    SimVar订阅分发：保存每个变量的最新值，值变化时回调订阅者
+    回调在推送数据的线程中执行（SimConnect的分发线程或回放线程），订阅者需尽快返回，
+    耗时操作（切换频道、更新界面）应转到自己的线程
+    """
+
+    def __init__(self, variables=DEFAULT_VARIABLES):
+        self.variables = tuple(variables)
+        self._values = {}
+        self._subscribers = {}  # name -> [callback]
+        self._lock = threading.Lock()
+        self.updates = 0  # 收到的推送次数
+        self.last_update = None  # 最后一次推送的时间（time.monotonic()）
+
+    def subscribe(self, name, callback):
+        """订阅变量变化，已经有值时立即用当前值回调一次；返回值可传给unsubscribe()"""
+        with self._lock:
+            self._subscribers.setdefault(name, []).append(callback)
+            value = self._values.get(name)
+        if value is not None:
+            callback(value)
+        return name, callback
+
+    def unsubscribe(self, subscription):
+        name, callback = subscription
+        with self._lock:
+            callbacks = self._subscribers.get(name, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def get(self, name):
+        """变量的最新值，还没有收到时返回None"""
+        return self._values.get(name)
+
+    def publish(self, values):
+        """推送一组新值（与variables顺序一致），只回调发生变化的变量"""
+        changed = []
+        with self._lock:
+            self.updates += 1
+            self.last_update = time.monotonic()
+            for variable, value in zip(self.variables, values):
+                if self._values.get(variable.name) != value:
+                    self._values[variable.name] = value
+                    changed.append((variable.name, value, list(self._subscribers.get(variable.name, ()))))
+        for name, value, callbacks in changed:
+            for callback in callbacks:
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"SimVar订阅回调出错 ({name}): {e}")
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+
+class SimConnectSubscription(SimVarService):
+    """
+    通过SimConnect订阅SimVar：所有变量登记在同一个数据定义中，只请求一次，
+    之后模拟器每帧检查，只有值变化时才推送（PERIOD_SIM_FRAME + FLAG_CHANGED），
+    不再需要定时轮询；推送在SimConnect库的分发线程中到达
+    """
+
+    def __init__(self, simconnect, variables=DEFAULT_VARIABLES):
+        super().__init__(variables)
+        self.simconnect = simconnect
+        self.definition_id = None
+        self.request_id = None
+        self._dispatch = None
+
+    def start(self):
+        from ctypes import POINTER, c_double, cast
+        from SimConnect.Constants import SIMCONNECT_OBJECT_ID_USER, SIMCONNECT_UNUSED
+        from SimConnect.Enum import (SIMCONNECT_DATA_REQUEST_FLAG, SIMCONNECT_DATATYPE, SIMCONNECT_PERIOD,
+                                     SIMCONNECT_RECV_ID, SIMCONNECT_RECV_SIMOBJECT_DATA)
+
+        sm = self.simconnect
+        self.definition_id = sm.new_def_id()
+        self.request_id = sm.new_request_id()
+        for variable in self.variables:
+            sm.dll.AddToDataDefinition(
+                sm.hSimConnect, self.definition_id.value, variable.simvar.encode(), variable.unit.encode(),
+                SIMCONNECT_DATATYPE.SIMCONNECT_DATATYPE_FLOAT64, variable.epsilon, SIMCONNECT_UNUSED
+            )
+
+        # SimConnect库只处理一次性请求的结果，周期请求的数据在这里先拦截，其余消息仍交给库处理；
+        # 库的分发线程每次循环都读取my_dispatch_proc_rd，替换后立即生效
+        count = len(self.variables)
+        request_id = self.request_id.value
+        library_dispatch = sm.my_dispatch_proc
+
+        def dispatch(pData, cbData, pContext):
+            if pData.contents.dwID == SIMCONNECT_RECV_ID.SIMCONNECT_RECV_ID_SIMOBJECT_DATA:
+                data = cast(pData, POINTER(SIMCONNECT_RECV_SIMOBJECT_DATA)).contents
+                if data.dwRequestID == request_id:
+                    self.publish(tuple(cast(data.dwData, POINTER(c_double * count)).contents))
+                    return
+            library_dispatch(pData, cbData, pContext)
+
+        self._dispatch = sm.dll.DispatchProc(dispatch)  # 保留引用，避免回调被回收
+        sm.my_dispatch_proc_rd = self._dispatch
+
+        sm.dll.RequestDataOnSimObject(
+            sm.hSimConnect, request_id, self.definition_id.value, SIMCONNECT_OBJECT_ID_USER,
+            SIMCONNECT_PERIOD.SIMCONNECT_PERIOD_SIM_FRAME,
+            SIMCONNECT_DATA_REQUEST_FLAG.SIMCONNECT_DATA_REQUEST_FLAG_CHANGED, 0, 0, 0
+        )
+        return self
+
+    def stop(self):
+        """取消周期请求，需在simconnect.exit()之前调用"""
+        if self.request_id is None:
+            return
+        from SimConnect.Constants import SIMCONNECT_OBJECT_ID_USER
+        from SimConnect.Enum import SIMCONNECT_DATA_REQUEST_FLAG, SIMCONNECT_PERIOD
+
+        sm = self.simconnect
+        try:
+            sm.dll.RequestDataOnSimObject(
+                sm.hSimConnect, self.request_id.value, self.definition_id.value, SIMCONNECT_OBJECT_ID_USER,
+                SIMCONNECT_PERIOD.SIMCONNECT_PERIOD_NEVER,
+                SIMCONNECT_DATA_REQUEST_FLAG.SIMCONNECT_DATA_REQUEST_FLAG_DEFAULT, 0, 0, 0
+            )
+        except OSError as e:
+            print(f"取消SimVar订阅失败: {e}")
+        self.request_id = None
+
+
+class ReplaySimVars(SimVarService):
+    """
+    本地回放：不连接模拟器，按时间表推送预先录好的值，用于测试频率切换和界面
+    events为[(秒, {变量名: 值}), ...]，时间相对start()；也可以随时调用push()手动推送，例如
+    ReplaySimVars().push({COM1_ACTIVE: 118.1})
+    """
+
+    def __init__(self, events=(), variables=DEFAULT_VARIABLES, loop=False):
+        super().__init__(variables)
+        self.events = sorted(events, key=lambda event: event[0])
+        self.loop = loop
+        self._stop = threading.Event()
+        self._thread = None
+
+    def push(self, values):
+        """推送部分变量的新值（{变量名: 值}），未给出的变量保持不变"""
+        self.publish(tuple(values.get(variable.name, self.get(variable.name)) for variable in self.variables))
+
+    def start(self):
+        if self.events:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._replay, daemon=True)
+            self._thread.start()
+        return self
+
+    def _replay(self):
+        while not self._stop.is_set():
+            start = time.monotonic()
+            for at, values in self.events:
+                if self._stop.wait(max(0.0, start + at - time.monotonic())):
+                    return
+                self.push(values)
+            if not self.loop:
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
@@ -0,0 +1,2 @@
+# 飞行员客户端（client）、管制员客户端（controller）和ATIS服务器（server/ATIS）共用的音频模块
+# 各程序入口把仓库根目录加入sys.path后以 from common.xxx import ... 导入
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import numpy as np
+
+
+class ChannelActivityMonitor:
+    """
+    按频道统计接收音频电平的活动监测器
+    作为SOUNDRECEIVED回调接收音频，只读取不消耗，播放路径照常拿到全部数据；
+    每个频道在数组中占一个位置，保存平滑后的RMS电平和最后一次有声音的时间，查询是O(1)
+    注：Mumble服务器只把同频道用户的语音发给本连接，因此这里只会统计到自己所在的频道
+    """
+
+    def __init__(self, threshold=100.0, smoothing=0.3, capacity=16):
+        self.threshold = threshold  # RMS高于此值视为有人说话
+        self.smoothing = smoothing  # 电平平滑系数，越大越跟随最新一帧
+        self._slots = {}  # channel_id -> 数组下标
+        self._levels = np.zeros(capacity, dtype=np.float64)
+        self._updated = np.zeros(capacity, dtype=np.float64)  # 最后收到音频的时间
+        self._last_voice = np.full(capacity, -np.inf)  # 最后一次电平超过阈值的时间
+        self._squares = np.zeros(0, dtype=np.int32)
+        self._lock = threading.Lock()  # 只在新增频道时使用
+
+    def _slot(self, channel_id):
+        slot = self._slots.get(channel_id)
+        if slot is None:
+            with self._lock:
+                slot = self._slots.get(channel_id)
+                if slot is None:
+                    slot = len(self._slots)
+                    if slot >= len(self._levels):
+                        # 先扩容数组再登记下标，读取方不会访问到越界位置
+                        grow = len(self._levels)
+                        self._levels = np.concatenate([self._levels, np.zeros(grow)])
+                        self._updated = np.concatenate([self._updated, np.zeros(grow)])
+                        self._last_voice = np.concatenate([self._last_voice, np.full(grow, -np.inf)])
+                    self._slots[channel_id] = slot
+        return slot
+
+    def _rms(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        count = len(samples)
+        if count == 0:
+            return 0.0
+        if len(self._squares) < count:
+            self._squares = np.zeros(count, dtype=np.int32)
+        squares = self._squares[:count]
+        # int16的平方最大为2^30，放得进int32；求和用int64
+        np.multiply(samples, samples, out=squares, dtype=np.int32)
+        return float(np.sqrt(squares.sum(dtype=np.int64) / count))
+
+    def on_sound(self, user, soundchunk):
+        """SOUNDRECEIVED回调，运行在pymumble的循环线程中"""
+        pcm = getattr(soundchunk, "pcm", None)
+        if not pcm:
+            return
+        now = time.monotonic()
+        slot = self._slot(user.get("channel_id", 0))
+        rms = self._rms(pcm)
+        level = self._levels[slot]
+        self._levels[slot] = level + (rms - level) * self.smoothing
+        self._updated[slot] = now
+        if rms > self.threshold:
+            self._last_voice[slot] = now
+
+    def level(self, channel_id, max_age=0.1):
+        """频道当前的平滑RMS电平，超过max_age秒没有收到音频时为0"""
+        slot = self._slots.get(channel_id)
+        if slot is None or time.monotonic() - self._updated[slot] > max_age:
+            return 0.0
+        return float(self._levels[slot])
+
+    def silent_for(self, channel_id):
+        """频道已经安静了多少秒（从未有人说话时为无穷大）"""
+        slot = self._slots.get(channel_id)
+        if slot is None:
+            return float("inf")
+        return time.monotonic() - float(self._last_voice[slot])
+
+    def is_silent(self, channel_id, duration=1.0):
+        """频道是否已经持续安静至少duration秒"""
+        return self.silent_for(channel_id) >= duration
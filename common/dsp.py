@@ -0,0 +1,371 @@
+import numpy as np
+
+INT16_MAX = 32767.0
+FRAME_SAMPLES = 960  # 20ms @ 48000Hz
+
+
+def db_to_linear(db):
+    return 10.0 ** (db / 20.0)
+
+
+class Stage:
+    """
+    处理链中的一个浮点环节
+    process()直接在传入的float32数组上原地修改（取值范围与int16相同），不返回新数组；
+    需要的临时数组在第一次遇到该帧长时分配，之后复用
+    """
+
+    enabled = True
+    fixed_point = False
+
+    def __init__(self):
+        self._scratch = {}
+
+    def scratch(self, samples, count=1):
+        """返回count个长度为samples的float32临时数组"""
+        buffers = self._scratch.get(samples)
+        if buffers is None or len(buffers) < count:
+            buffers = [np.zeros(samples, dtype=np.float32) for _ in range(count)]
+            self._scratch[samples] = buffers
+        return buffers
+
+    def ramp(self, samples):
+        """0到1（不含1）的线性斜坡，用于帧内平滑过渡增益"""
+        key = -samples
+        ramp = self._scratch.get(key)
+        if ramp is None:
+            ramp = np.arange(samples, dtype=np.float32) / samples
+            self._scratch[key] = ramp
+        return ramp
+
+    def apply_gain_ramp(self, x, start, end):
+        """从start到end平滑改变增益，避免帧边界的咔嗒声"""
+        if start == end:
+            if start != 1.0:
+                np.multiply(x, start, out=x)
+            return
+        (gain,) = self.scratch(len(x))
+        np.multiply(self.ramp(len(x)), end - start, out=gain)
+        gain += start
+        np.multiply(x, gain, out=x)
+
+    def process(self, x):
+        raise NotImplementedError
+
+    def reset(self):
+        """清除内部状态（例如PTT松开后重新开始）"""
+
+
+GAIN_SHIFT = 14  # Q14定点增益：1.0 对应 16384
+GAIN_ONE = 1 << GAIN_SHIFT
+MAX_GAIN = 3.99  # int16 * Q14增益必须能放进int32
+
+
+class GainKernel:
+    """
+    定点增益+饱和限幅，处理单声道int16音频（音量）
+    放在DspChain中时直接处理输入的int16数据，必须排在浮点环节之前；也可以单独使用。
+    中间结果和输出都写入预分配的缓冲区，每帧不分配新的数组；
+    process()返回内部缓冲区的memoryview，调用方需在下一次process前用完（需要长期保存时自己复制）
+    """
+
+    enabled = True
+    fixed_point = True
+
+    def __init__(self, gain=1.0, frame_samples=FRAME_SAMPLES):
+        self._acc = np.zeros(frame_samples, dtype=np.int32)
+        self._out = np.zeros(frame_samples, dtype=np.int16)
+        self._views = {}  # 帧长 -> (acc, out, memoryview)，避免每帧重新切片
+        self.set_gain(gain)
+
+    def set_gain(self, gain):
+        """设置线性增益（1.0为原始音量），可在其他线程中调用"""
+        self.gain = max(0.0, min(MAX_GAIN, float(gain)))
+        self._q = np.int32(round(self.gain * GAIN_ONE))
+
+    def _buffers(self, samples):
+        buffers = self._views.get(samples)
+        if buffers is None:
+            if samples > len(self._out):
+                self._acc = np.zeros(samples, dtype=np.int32)
+                self._out = np.zeros(samples, dtype=np.int16)
+                self._views.clear()
+            out = self._out[:samples]
+            buffers = (self._acc[:samples], out, memoryview(out).cast("B"))
+            self._views[samples] = buffers
+        return buffers
+
+    def _apply(self, samples, acc, out):
+        q = self._q
+        if q == GAIN_ONE:
+            np.copyto(out, samples)
+        elif q == 0:
+            out.fill(0)
+        else:
+            np.multiply(samples, q, out=acc)
+            np.right_shift(acc, GAIN_SHIFT, out=acc)
+            np.clip(acc, -32768, 32767, out=acc)
+            np.copyto(out, acc, casting="unsafe")
+
+    def process_array(self, samples):
+        """对int16数组做增益，返回内部复用的int16数组"""
+        acc, out, _ = self._buffers(len(samples))
+        self._apply(samples, acc, out)
+        return out
+
+    def process(self, data):
+        """对一帧int16 PCM（bytes/bytearray/memoryview）做增益，返回结果的memoryview"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        acc, out, view = self._buffers(len(samples))
+        self._apply(samples, acc, out)
+        return view
+
+    def reset(self):
+        pass
+
+
+class AGC(Stage):
+    """
+    自动增益控制：把每帧的RMS拉向目标电平
+    电平过高时快速降低增益，过低时缓慢提高；低于噪声门限的帧不调整，避免把底噪放大
+    """
+
+    def __init__(self, target_db=-20.0, max_gain_db=12.0, min_gain_db=-12.0,
+                 noise_floor_db=-50.0, attack=0.5, release=0.05):
+        super().__init__()
+        self.target = db_to_linear(target_db) * INT16_MAX
+        self.max_gain = db_to_linear(max_gain_db)
+        self.min_gain = db_to_linear(min_gain_db)
+        self.noise_floor = db_to_linear(noise_floor_db) * INT16_MAX
+        self.attack = attack  # 每帧向目标增益靠近的比例（降低增益时）
+        self.release = release  # 每帧向目标增益靠近的比例（提高增益时）
+        self.gain = 1.0
+
+    def process(self, x):
+        rms = float(np.sqrt(np.dot(x, x) / len(x)))
+        start = self.gain
+        if rms > self.noise_floor:
+            desired = min(self.max_gain, max(self.min_gain, self.target / rms))
+            rate = self.attack if desired < start else self.release
+            self.gain = start + (desired - start) * rate
+        self.apply_gain_ramp(x, start, self.gain)
+
+    def reset(self):
+        self.gain = 1.0
+
+
+class NoiseGate(Stage):
+    """
+    噪声门：帧RMS低于阈值并超过保持时间后衰减到floor，高于阈值时立即打开
+    """
+
+    def __init__(self, threshold_db=-50.0, hold=0.2, floor_db=-40.0, frame_duration=0.02):
+        super().__init__()
+        self.threshold = db_to_linear(threshold_db) * INT16_MAX
+        self.hold_frames = max(1, int(round(hold / frame_duration)))
+        self.floor = db_to_linear(floor_db)
+        self.gain = 1.0
+        self._closed_frames = 0
+
+    def process(self, x):
+        rms = float(np.sqrt(np.dot(x, x) / len(x)))
+        start = self.gain
+        if rms >= self.threshold:
+            self._closed_frames = 0
+            self.gain = 1.0
+        else:
+            self._closed_frames += 1
+            if self._closed_frames > self.hold_frames:
+                self.gain = self.floor
+        self.apply_gain_ramp(x, start, self.gain)
+
+    @property
+    def is_open(self):
+        return self.gain == 1.0
+
+    def reset(self):
+        self.gain = 1.0
+        self._closed_frames = 0
+
+
+class VAD(Stage):
+    """
+    语音活动检测：不修改音频，只根据帧能量和过零率设置speech标志
+    能量需高于固定阈值和自适应底噪，过零率过高（宽带噪声）的帧只有能量明显更高时才算语音；
+    检测到语音后保持hangover时长，避免句尾和字间停顿被截断
+    """
+
+    def __init__(self, threshold_db=-45.0, noise_margin_db=10.0, max_zcr=0.25,
+                 hangover=0.3, frame_duration=0.02):
+        super().__init__()
+        self.threshold = db_to_linear(threshold_db) * INT16_MAX
+        self.noise_margin = db_to_linear(noise_margin_db)
+        self.max_zcr = max_zcr  # 每个样本的过零次数，语音通常明显低于白噪声的0.5
+        self.hangover_frames = max(1, int(round(hangover / frame_duration)))
+        self.noise_floor = self.threshold / self.noise_margin
+        self.speech = False
+        self._hangover = 0
+        self._signs = {}  # 帧长 -> (符号数组, 比较结果数组)
+
+    def _sign_buffers(self, samples):
+        buffers = self._signs.get(samples)
+        if buffers is None:
+            buffers = (np.zeros(samples, dtype=bool), np.zeros(samples - 1, dtype=bool))
+            self._signs[samples] = buffers
+        return buffers
+
+    def process(self, x):
+        samples = len(x)
+        rms = float(np.sqrt(np.dot(x, x) / samples))
+        signs, changes = self._sign_buffers(samples)
+        np.signbit(x, out=signs)
+        np.not_equal(signs[1:], signs[:-1], out=changes)
+        zcr = np.count_nonzero(changes) / samples
+
+        threshold = max(self.threshold, self.noise_floor * self.noise_margin)
+        voiced = bool(rms > threshold and (zcr < self.max_zcr or rms > threshold * 4))
+        if voiced:
+            self._hangover = self.hangover_frames
+        else:
+            # 只用非语音帧更新底噪：下降快、上升慢
+            rate = 0.2 if rms < self.noise_floor else 0.02
+            self.noise_floor += (rms - self.noise_floor) * rate
+            if self._hangover > 0:
+                self._hangover -= 1
+        self.speech = voiced or self._hangover > 0
+
+    def reset(self):
+        self.speech = False
+        self._hangover = 0
+
+
+class SoftLimiter(Stage):
+    """
+    软限幅：低于阈值的样本不变，超过阈值的部分用tanh平滑压缩，输出不会超过满幅，
+    比直接截断失真小
+    """
+
+    def __init__(self, threshold_db=-3.0):
+        super().__init__()
+        self.threshold = db_to_linear(threshold_db) * INT16_MAX
+        self.knee = INT16_MAX - self.threshold
+
+    def process(self, x):
+        magnitude, linear = self.scratch(len(x), 2)
+        np.abs(x, out=magnitude)
+        if magnitude.max() <= self.threshold:
+            return
+        np.minimum(magnitude, self.threshold, out=linear)
+        magnitude -= self.threshold
+        np.maximum(magnitude, 0.0, out=magnitude)
+        magnitude /= self.knee
+        np.tanh(magnitude, out=magnitude)
+        magnitude *= self.knee
+        magnitude += linear
+        np.copysign(magnitude, x, out=x)
+
+
+class DspChain:
+    """
+    按顺序执行各处理环节的int16单声道处理链
+    每个音频流各用一个实例：开头的定点环节（GainKernel）直接处理int16输入，
+    结果转换到预分配的float32缓冲区，由浮点环节依次原地处理，
+    最后饱和转换回预分配的int16缓冲区；返回值是内部缓冲区，调用方需在下一次处理前用完
+    """
+
+    def __init__(self, stages=(), frame_samples=FRAME_SAMPLES):
+        self.stages = list(stages)
+        self._fixed = []
+        for stage in self.stages:
+            if not stage.fixed_point:
+                break
+            self._fixed.append(stage)
+        if any(stage.fixed_point for stage in self.stages[len(self._fixed):]):
+            raise ValueError("定点环节必须排在浮点环节之前")
+        self._float = self.stages[len(self._fixed):]
+        self._work = np.zeros(frame_samples, dtype=np.float32)
+        self._out = np.zeros(frame_samples, dtype=np.int16)
+        self._views = {}  # 帧长 -> (work, out, memoryview)
+
+    def _buffers(self, samples):
+        buffers = self._views.get(samples)
+        if buffers is None:
+            if samples > len(self._out):
+                self._work = np.zeros(samples, dtype=np.float32)
+                self._out = np.zeros(samples, dtype=np.int16)
+                self._views.clear()
+            out = self._out[:samples]
+            buffers = (self._work[:samples], out, memoryview(out).cast("B"))
+            self._views[samples] = buffers
+        return buffers
+
+    def _run(self, samples, work, out):
+        for stage in self._fixed:
+            if stage.enabled:
+                samples = stage.process_array(samples)
+        np.copyto(work, samples)
+        for stage in self._float:
+            if stage.enabled:
+                stage.process(work)
+        np.rint(work, out=work)
+        np.clip(work, -32768, 32767, out=work)
+        np.copyto(out, work, casting="unsafe")
+
+    def process_array(self, samples):
+        """处理int16数组，返回内部复用的int16数组"""
+        work, out, _ = self._buffers(len(samples))
+        self._run(samples, work, out)
+        return out
+
+    def process(self, data):
+        """处理一帧int16 PCM（bytes/bytearray/memoryview），返回结果的memoryview"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        work, out, view = self._buffers(len(samples))
+        self._run(samples, work, out)
+        return view
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+    def render(self, data, frame_samples=FRAME_SAMPLES):
+        """按帧处理一整段离线音频（例如TTS结果），返回新的bytes"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        result = np.empty_like(samples)
+        self.reset()
+        for start in range(0, len(samples), frame_samples):
+            end = min(start + frame_samples, len(samples))
+            result[start:end] = self.process_array(samples[start:end])
+        return result.tobytes()
+
+
+def benchmark(frames=2000, frame_samples=FRAME_SAMPLES):
+    """测量每个环节和整条处理链处理一帧的平均耗时（毫秒）"""
+    import time
+
+    rng = np.random.default_rng(0)
+    t = np.arange(frame_samples * frames) / 48000.0
+    # 语音频段的正弦加噪声，幅度有大有小，让门限、AGC和限幅都会实际工作
+    envelope = 0.1 + 0.9 * (np.sin(2 * np.pi * 0.5 * t) > 0)
+    signal = envelope * (0.9 * np.sin(2 * np.pi * 440 * t) + 0.1 * rng.standard_normal(len(t)))
+    pcm = np.clip(signal * 40000, -32768, 32767).astype(np.int16).reshape(frames, frame_samples)
+
+    results = {}
+    candidates = [("GainKernel", GainKernel(1.5)), ("AGC", AGC()), ("NoiseGate", NoiseGate()), ("VAD", VAD()),
+                  ("SoftLimiter", SoftLimiter())]
+    candidates.append(("Chain", DspChain([GainKernel(1.5), AGC(), VAD(), NoiseGate(), SoftLimiter()], frame_samples)))
+    for name, stage in candidates:
+        chain = stage if isinstance(stage, DspChain) else DspChain([stage], frame_samples)
+        for frame in pcm[:50]:  # 预热，分配临时数组
+            chain.process_array(frame)
+        start = time.perf_counter()
+        for frame in pcm:
+            chain.process_array(frame)
+        results[name] = (time.perf_counter() - start) * 1000 / frames
+    return results
+
+
+if __name__ == "__main__":
+    budget = FRAME_SAMPLES / 48000.0 * 1000
+    for name, ms in benchmark().items():
+        print(f"{name:12s} {ms * 1000:8.1f} us/帧  ({ms / budget * 100:.2f}% 实时, {'OK' if ms < 1.0 else '超过1ms'})")
@@ -0,0 +1,205 @@
+import threading
+import time
+
+import numpy as np
+
+SEQUENCE_DURATION = 0.01  # Mumble序列号每个单位代表10ms音频
+MAX_CONCEALED = 3  # 连续丢包时最多用衰减的上一帧补几帧，之后补静音
+RESET_GAP = 50  # 序列号倒退超过0.5秒视为新的发射（对方序列号已重置）
+
+
+class JitterBuffer:
+    """
+    单个远端用户的自适应抖动缓冲区
+    按SoundChunk的序列号重新排序，丢包时用衰减的上一帧补偿，
+    目标缓冲深度根据到达间隔的抖动估计（RFC 3550算法）动态调整
+    注：pymumble的SoundChunk.timestamp是模块加载时的固定默认值，不可用，到达时间在这里自己测量
+    """
+
+    def __init__(self, rate=48000, robustness=0.5, max_delay=0.3):
+        self.rate = rate
+        self.max_delay = max_delay
+        self.set_robustness(robustness)
+        self._lock = threading.Lock()
+        self._frames = {}  # 序列号 -> int16数组
+        self._buffered_samples = 0
+        self._jitter = 0.0  # 到达间隔抖动估计（秒）
+        self._last_seq = None
+        self._last_arrival = None
+        self._first_arrival = None  # 本次缓冲开始的时间
+        self.playing = False
+        self._next_seq = None
+        self._current = None
+        self._pos = 0
+        self._last_frame = None
+        self._lost_run = 0
+        self._stopped_seq = None
+        self._stopped_at = 0.0
+        self.received = 0
+        self.late = 0  # 到达太晚被丢弃的帧
+        self.concealed = 0  # 丢失后补偿的帧
+        self.discarded = 0  # 缓冲过深时主动丢弃的帧
+        self.underruns = 0  # 播放中途缓冲区取空的次数
+
+    def set_robustness(self, robustness):
+        """
+        延迟/抗抖动调节：0为最低延迟，1为最强抗抖动
+        """
+        self.robustness = max(0.0, min(1.0, robustness))
+        self._jitter_factor = 1.0 + 4.0 * self.robustness
+        self._min_delay = 0.02 + 0.04 * self.robustness
+
+    def target_delay(self):
+        """当前目标缓冲深度（秒）"""
+        return min(self.max_delay, max(self._min_delay, self._jitter_factor * self._jitter))
+
+    def put(self, sequence, pcm, arrival=None):
+        """
+        接收回调中调用，写入一帧
+        pcm: int16数据（bytes或数组），写入后调用方不应再修改
+        """
+        if arrival is None:
+            arrival = time.monotonic()
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        if len(samples) == 0:
+            return
+
+        with self._lock:
+            self.received += 1
+            if self._last_seq is not None and sequence > self._last_seq:
+                # 实际到达间隔与序列号推算的间隔之差
+                deviation = (arrival - self._last_arrival) - (sequence - self._last_seq) * SEQUENCE_DURATION
+                self._jitter += (abs(deviation) - self._jitter) / 16
+            if self._last_seq is None or sequence > self._last_seq or self._last_seq - sequence > RESET_GAP:
+                self._last_seq = sequence
+                self._last_arrival = arrival
+
+            if self._next_seq is not None and sequence < self._next_seq:
+                if self._next_seq - sequence > RESET_GAP:
+                    self._reset_playout()
+                else:
+                    self.late += 1
+                    return
+
+            if not self.playing:
+                if self._stopped_seq is not None:
+                    # 缓冲区取空后很快又收到连续的帧，说明是欠载而不是对方停止说话
+                    if 0 <= sequence - self._stopped_seq < 20 and arrival - self._stopped_at < 0.2:
+                        self.underruns += 1
+                    self._stopped_seq = None
+                if not self._frames:
+                    self._first_arrival = arrival
+
+            if sequence in self._frames:
+                return
+            self._frames[sequence] = samples
+            self._buffered_samples += len(samples)
+
+            # 缓冲超过上限时丢弃最旧的帧
+            while self._buffered_samples > self.max_delay * 2 * self.rate and len(self._frames) > 1:
+                self._discard_oldest()
+
+    def _discard_oldest(self):
+        oldest = min(self._frames)
+        frame = self._frames.pop(oldest)
+        self._buffered_samples -= len(frame)
+        self.discarded += 1
+        if self._next_seq is not None and oldest >= self._next_seq:
+            self._next_seq = oldest + self._units(len(frame))
+
+    def _units(self, samples):
+        return max(1, int(round(samples / (self.rate * SEQUENCE_DURATION))))
+
+    def _reset_playout(self):
+        self.playing = False
+        self._next_seq = None
+        self._current = None
+        self._pos = 0
+        self._last_frame = None
+        self._lost_run = 0
+
+    def _next_frame(self, now):
+        """准备下一帧到_current，没有可播放的内容时返回False"""
+        if not self.playing:
+            if not self._frames:
+                return False
+            buffered = self._buffered_samples / self.rate
+            target = self.target_delay()
+            if buffered < target and now - self._first_arrival < target:
+                return False  # 仍在积累缓冲
+            self.playing = True
+            self._next_seq = min(self._frames)
+
+        # 缓冲明显超过目标深度时丢帧追赶，降低延迟
+        target_samples = (self.target_delay() + 0.04) * self.rate
+        while self._buffered_samples > target_samples and len(self._frames) > 1:
+            self._discard_oldest()
+
+        frame = self._frames.pop(self._next_seq, None)
+        if frame is not None:
+            self._buffered_samples -= len(frame)
+            self._current = frame
+            self._last_frame = frame
+            self._lost_run = 0
+            self._next_seq += self._units(len(frame))
+            return True
+
+        if not self._frames:
+            # 缓冲区取空：对方停止说话，或者网络欠载
+            self._stopped_seq = self._next_seq
+            self._stopped_at = now
+            self._reset_playout()
+            return False
+
+        # 中间有丢包：先用衰减的上一帧补偿，连续丢太多时补静音或直接跳到下一帧
+        self.concealed += 1
+        self._lost_run += 1
+        length = len(self._last_frame) if self._last_frame is not None else int(self.rate * 0.02)
+        if self._last_frame is not None and self._lost_run <= MAX_CONCEALED:
+            self._current = (self._last_frame * (0.5 ** self._lost_run)).astype(np.int16)
+        else:
+            self._current = np.zeros(length, dtype=np.int16)
+        self._next_seq += self._units(length)
+        if self._lost_run > MAX_CONCEALED:
+            self._next_seq = max(self._next_seq, min(self._frames))
+        return True
+
+    def read_into(self, out):
+        """
+        声卡回调中调用，填满out（int16数组），不足部分补零
+        返回是否输出了任何音频
+        """
+        size = len(out)
+        filled = 0
+        now = time.monotonic()
+        with self._lock:
+            while filled < size:
+                if self._current is None or self._pos >= len(self._current):
+                    self._current = None
+                    self._pos = 0
+                    if not self._next_frame(now):
+                        break
+                take = min(size - filled, len(self._current) - self._pos)
+                out[filled:filled + take] = self._current[self._pos:self._pos + take]
+                filled += take
+                self._pos += take
+        if filled < size:
+            out[filled:] = 0
+        return filled > 0
+
+    def is_idle(self):
+        """没有在播放也没有待播放的数据"""
+        return not self.playing and not self._frames and self._current is None
+
+    def stats(self):
+        """返回统计信息"""
+        return {
+            "buffered_ms": self._buffered_samples * 1000 / self.rate,
+            "target_ms": self.target_delay() * 1000,
+            "jitter_ms": self._jitter * 1000,
+            "received": self.received,
+            "late": self.late,
+            "concealed": self.concealed,
+            "discarded": self.discarded,
+            "underruns": self.underruns,
+        }
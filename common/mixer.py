@@ -0,0 +1,108 @@
+import threading
+import time
+
+import numpy as np
+
+from .jitter import JitterBuffer
+
+
+class Mixer:
+    """
+    多路接收音频混音器
+    每个说话的用户(session)有独立的自适应抖动缓冲区，声卡回调每次把所有活跃用户的同一时段相加并限幅，
+    多人同时发射时输出时长和延迟都不会叠加
+    """
+
+    def __init__(self, rate=48000, robustness=0.5, idle_timeout=5.0):
+        self.rate = rate
+        self.robustness = robustness
+        self.idle_timeout = idle_timeout
+        self._speakers = {}  # session -> JitterBuffer
+        self._last_active = {}  # session -> 最后一次有数据的时间
+        self._lock = threading.Lock()  # 保护用户的增删：写入（接收线程）与移除（声卡回调、用户离开）互斥
+        self._acc = np.zeros(0, dtype=np.int32)
+        self._frame = np.zeros(0, dtype=np.int16)
+        self._out = np.zeros(0, dtype=np.int16)
+        self._totals = {}  # 已移除用户的累计统计
+
+    def set_robustness(self, robustness):
+        """设置所有用户抖动缓冲区的延迟/抗抖动程度（0-1）"""
+        self.robustness = robustness
+        for buffer in list(self._speakers.values()):
+            buffer.set_robustness(robustness)
+
+    def add(self, session, sequence, pcm):
+        """接收回调中调用：把一个用户的一帧PCM写入其抖动缓冲区"""
+        # 查找和写入都在锁内，不会写进刚被移除的缓冲区而丢失这一帧
+        with self._lock:
+            buffer = self._speakers.get(session)
+            if buffer is None:
+                buffer = JitterBuffer(self.rate, self.robustness)
+                self._speakers[session] = buffer
+            buffer.put(sequence, pcm)
+
+    def remove(self, session):
+        """用户离开时丢弃其缓冲区"""
+        with self._lock:
+            self._drop(session)
+
+    def _drop(self, session):
+        """调用方持有锁"""
+        buffer = self._speakers.pop(session, None)
+        self._last_active.pop(session, None)
+        if buffer is not None:
+            for key in ("late", "concealed", "discarded", "underruns"):
+                self._totals[key] = self._totals.get(key, 0) + buffer.stats()[key]
+
+    def _ensure_size(self, samples):
+        if len(self._out) != samples:
+            self._acc = np.zeros(samples, dtype=np.int32)
+            self._frame = np.zeros(samples, dtype=np.int16)
+            self._out = np.zeros(samples, dtype=np.int16)
+
+    def mix(self, samples):
+        """
+        声卡回调中调用：混合所有活跃用户的下一段音频
+        返回长度为samples的int16数组（内部复用，调用方需在下次mix前用完）
+        """
+        self._ensure_size(samples)
+        acc = self._acc
+        acc.fill(0)
+        now = time.monotonic()
+        idle = []
+
+        for session, buffer in list(self._speakers.items()):
+            if buffer.read_into(self._frame):
+                self._last_active[session] = now
+                np.add(acc, self._frame, out=acc)
+            elif buffer.is_idle() and now - self._last_active.setdefault(session, now) > self.idle_timeout:
+                idle.append(session)
+
+        # 饱和限幅后写回int16
+        np.clip(acc, -32768, 32767, out=acc)
+        self._out[:] = acc
+
+        if idle:
+            with self._lock:
+                for session in idle:
+                    buffer = self._speakers.get(session)
+                    if buffer is not None and buffer.is_idle():
+                        self._drop(session)
+        return self._out
+
+    def active_speakers(self):
+        """当前正在播放的用户数"""
+        return sum(1 for buffer in list(self._speakers.values()) if not buffer.is_idle())
+
+    def stats(self):
+        """返回混音和抖动缓冲统计信息"""
+        speakers = [buffer.stats() for buffer in list(self._speakers.values())]
+        result = {
+            "speakers": len(speakers),
+            "active": self.active_speakers(),
+            "buffered_ms": max((s["buffered_ms"] for s in speakers), default=0.0),
+            "target_ms": max((s["target_ms"] for s in speakers), default=0.0),
+        }
+        for key in ("late", "concealed", "discarded", "underruns"):
+            result[key] = self._totals.get(key, 0) + sum(s[key] for s in speakers)
+        return result
@@ -0,0 +1,65 @@
+import time
+
+
+class FramePacer:
+    """
+    基于单调时钟的帧节拍器
+    每次wait()在下一帧的截止时间返回，截止时间按固定步长累加，处理耗时不会累积成漂移；
+    落后太多时重新对齐，避免一次性突发大量音频
+    """
+
+    def __init__(self, frame_duration=0.02, max_lag=0.2):
+        self.frame_duration = frame_duration
+        self.max_lag = max_lag
+        self.next_deadline = None
+        self.frames = 0
+        self.underruns = 0  # 晚于截止时间超过一帧的次数
+        self.resyncs = 0  # 落后超过max_lag后重新对齐的次数
+        self.jitter = 0.0  # 平均延迟（指数平滑，秒）
+        self.max_jitter = 0.0
+
+    def reset(self):
+        """从当前时刻重新开始计时，用于暂停之后恢复发送"""
+        self.next_deadline = None
+
+    def wait(self, stop_event=None):
+        """
+        等待到下一帧的发送时间
+        stop_event: 可选的threading.Event，被设置时立即返回False
+        """
+        now = time.monotonic()
+        if self.next_deadline is None:
+            self.next_deadline = now
+
+        delay = self.next_deadline - now
+        if delay > 0:
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+            now = time.monotonic()
+        elif stop_event is not None and stop_event.is_set():
+            return False
+
+        lateness = now - self.next_deadline
+        self.frames += 1
+        self.jitter += (lateness - self.jitter) / 16
+        self.max_jitter = max(self.max_jitter, lateness)
+        if lateness > self.frame_duration:
+            self.underruns += 1
+        if lateness > self.max_lag:
+            self.resyncs += 1
+            self.next_deadline = now
+        self.next_deadline += self.frame_duration
+        return True
+
+    def stats(self):
+        """返回节拍统计信息"""
+        return {
+            "frames": self.frames,
+            "underruns": self.underruns,
+            "resyncs": self.resyncs,
+            "jitter_ms": self.jitter * 1000,
+            "max_jitter_ms": self.max_jitter * 1000,
+        }
@@ -0,0 +1,41 @@
+SAMPLE_RATE = 48000
+SAMPLE_WIDTH = 2  # int16
+FRAME_DURATION = 0.02  # 与Mumble的音频包长度一致
+FRAME_SAMPLES = int(SAMPLE_RATE * FRAME_DURATION)  # 960
+FRAME_BYTES = FRAME_SAMPLES * SAMPLE_WIDTH  # 1920
+
+
+class PcmBuffer:
+    """
+    按编码帧对齐的单声道int16 PCM缓冲区
+    frame()返回原始数据的memoryview切片，不复制数据；只有最后不足一帧的部分会补零
+    """
+
+    def __init__(self, pcm, frame_bytes=FRAME_BYTES):
+        self.frame_bytes = frame_bytes
+        self._view = memoryview(pcm).cast("B")
+        self._full_frames, self._tail = divmod(len(self._view), frame_bytes)
+
+    def __len__(self):
+        """帧数（包含补零后的最后一帧）"""
+        return self._full_frames + (1 if self._tail else 0)
+
+    @property
+    def duration(self):
+        return len(self) * self.frame_bytes / (SAMPLE_RATE * SAMPLE_WIDTH)
+
+    def frame(self, index):
+        """返回第index帧，长度恰好为frame_bytes"""
+        start = index * self.frame_bytes
+        if index < self._full_frames:
+            return self._view[start:start + self.frame_bytes]
+        if index == self._full_frames and self._tail:
+            padded = bytearray(self.frame_bytes)
+            padded[:self._tail] = self._view[start:]
+            return memoryview(padded)
+        raise IndexError("frame index out of range")
+
+    def frames(self, start=0):
+        """从第start帧开始依次返回各帧"""
+        for index in range(start, len(self)):
+            yield self.frame(index)
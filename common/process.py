@@ -0,0 +1,293 @@
+import functools
+import re
+from collections import namedtuple
+
+chinese_numbers = {
+    0: "洞",
+    1: "幺",
+    2: "两",
+    3: "三",
+    4: "四",
+    5: "五",
+    6: "六",
+    7: "拐",
+    8: "八",
+    9: "九",
+}
+
+english_numbers = {
+    0: "zero",
+    1: "one",
+    2: "two",
+    3: "three",
+    4: "four",
+    5: "five",
+    6: "six",
+    7: "seven",
+    8: "eight",
+    9: "niner",
+}
+
+english_characters = {
+    "A": "Alpha",
+    "B": "Bravo",
+    "C": "Charlie",
+    "D": "Delta",
+    "E": "Echo",
+    "F": "Foxtrot",
+    "G": "Golf",
+    "H": "Hotel",
+    "I": "India",
+    "J": "Juliett",
+    "K": "Kilo",
+    "L": "Lima",
+    "M": "Mike",
+    "N": "November",
+    "O": "Oscar",
+    "P": "Papa",
+    "Q": "Quebec",
+    "R": "Romeo",
+    "S": "Sierra",
+    "T": "Tango",
+    "U": "Uniform",
+    "V": "Victor",
+    "W": "Whiskey",
+    "X": "X-ray",
+    "Y": "Yankee",
+    "Z": "Zulu"
+}
+
+# 数字逐位读法：规则替换完成后对整段文本逐个数字str.replace，不走str.translate（字典转换表逐字符查找很慢）
+_digit_replacements = {
+    False: tuple((str(digit), f" {name} ") for digit, name in english_numbers.items()),
+    True: tuple((str(digit), f" {name} ") for digit, name in chinese_numbers.items()),
+}
+
+runway_sides = {
+    False: {"L": "left", "R": "right", "C": "center"},
+    True: {"L": "左", "R": "右", "C": "中"},
+}
+
+
+def spell_all_digits(text, is_chinese=False):
+    """把文本中的数字全部逐位读出，前后补空格，多余的空格由调用方统一合并"""
+    for digit, name in _digit_replacements[is_chinese]:
+        if digit in text:
+            text = text.replace(digit, name)
+    return text
+
+
+def spell_digits(digits, is_chinese=False):
+    """逐位读出数字串，例如 035 读作 zero three five"""
+    return " ".join(spell_all_digits(digits, is_chinese).split())
+
+
+# 规则的读法只负责换词和调整顺序，其中的数字原样保留，最后和规则之外的数字一起逐位读出；
+# match为该规则的匹配结果，按分组名取字段
+
+def _read_wind(match, is_chinese):
+    """风向风速组，例如 03005G15KT、VRB02MPS，前面的WIND/风等字样一并读出"""
+    direction, speed, gust, unit = match.group("dir", "speed", "gust", "unit")
+    speed = int(speed)
+    if is_chinese:
+        unit_text = "米每秒" if unit == "MPS" else "节"
+        text = "风向不定" if direction == "VRB" else f"风向 {direction} 度"
+        text += f" 风速 {speed} {unit_text}"
+        if gust:
+            text += f" 阵风 {int(gust)} {unit_text}"
+    else:
+        unit_text = "meters per second" if unit == "MPS" else "knots"
+        text = "wind variable" if direction == "VRB" else f"wind {direction} degrees"
+        text += f" {speed} {unit_text}"
+        if gust:
+            text += f" gusting {int(gust)} {unit_text}"
+    return text
+
+
+def _read_runway(match, is_chinese):
+    """跑道号，例如 RWY 18L、RUNWAY 36"""
+    text = "跑道" if is_chinese else "runway"
+    return f"{text} {_read_designator(match, is_chinese)}"
+
+
+def _read_designator(match, is_chinese):
+    """单独出现的跑道号，例如跑道列表 35L 34R 中的第二个"""
+    number, side = match.group("num", "side")
+    if side:
+        return f"{number} {runway_sides[is_chinese][side]}"
+    return number
+
+
+def _read_qnh(match, is_chinese):
+    """修正海压，例如 QNH 1013、Q1013、修正海压 Q1013"""
+    return f"修正海压 {match['value']}" if is_chinese else f"QNH {match['value']}"
+
+
+def _read_altimeter(match, is_chinese):
+    """英制高度表拨正值，例如 A2992"""
+    return f"高度表 {match['inhg']}" if is_chinese else f"altimeter {match['inhg']}"
+
+
+def _read_letter(match, is_chinese):
+    """独立的大写字母读作无线电字母"""
+    letter = match[0]
+    return english_characters.get(letter, letter)
+
+
+Rule = namedtuple("Rule", ["name", "pattern", "handler"])
+
+# 按优先级排列：具体的航空规则在前，通用的字母规则在最后；
+# 规则都没有处理的数字最后统一逐位读出（spell_all_digits），不占用正则的分支和回调
+default_rules = [
+    Rule("wind", r"(?:(?<!\w)(?:SFC\s+)?WIND\s+|地面风\s*|风\s*)?(?<!\w)(?P<dir>\d{3}|VRB)(?P<speed>\d{2,3})(?:G(?P<gust>\d{2,3}))?(?P<unit>KT|MPS)(?!\w)", _read_wind),
+    Rule("runway", r"(?:\b(?:RWY|RUNWAY)|跑道)\s*(?P<num>[0-3]\d)(?P<side>[LRC])?(?!\w)", _read_runway),
+    Rule("designator", r"(?<!\w)(?P<num>[0-3]\d)(?P<side>[LRC])(?!\w)", _read_designator),
+    Rule("qnh", r"(?:修正海压\s*)?(?<!\w)(?:QNH\s*|Q)(?P<value>\d{4})(?!\w)", _read_qnh),
+    Rule("altimeter", r"(?<!\w)A(?P<inhg>\d{4})(?!\w)", _read_altimeter),
+    Rule("letter", r"(?<!\S)[A-Z](?!\S)", _read_letter),
+]
+
+
+class AtisNormalizer:
+    """
+    ATIS文本读法转换引擎
+    所有规则合并成一个预编译的正则，一次扫描完成替换，剩下的数字再逐位读出；
+    结果按(文本, 语言)缓存，ATIS内容不变时重复调用直接返回缓存
+    """
+
+    # 规则只可能从这些位置开始匹配：词首的数字、单独的字母、规则的关键词，或中文关键词的第一个字
+    anchor = r"\d|[A-Z](?!\w)|[AQ]\d|WIND|SFC|RWY|RUNWAY|QNH|VRB"
+    chinese_anchor = "[地风跑修]"
+
+    def __init__(self, rules=None, cache_size=512):
+        self.rules = list(default_rules if rules is None else rules)
+        self.normalize = functools.lru_cache(maxsize=cache_size)(self._normalize)
+        self._compile()
+
+    def _compile(self):
+        readers = {}
+        alternatives = []
+        for index, rule in enumerate(self.rules):
+            # 合并的正则只负责定位和区分规则：规则内的命名分组改成不捕获，各规则的分组名不会冲突，
+            # 规则编号用末尾的空分组标记（命中后是最后一个结束的分组，即match.lastgroup）
+            pattern = re.sub(r"\(\?P<[^>]+>", "(?:", rule.pattern)
+            alternatives.append(f"(?:{pattern})(?P<r{index}>)")
+            readers[f"r{index}"] = (rule.handler, re.compile(rule.pattern))
+        # 先过滤掉单词中间的位置，避免每个字符都尝试所有规则；
+        # 纯ASCII的文本不会出现中文关键词，词首判断放在最前面，大部分位置一次后顾就被排除，
+        # 并且按ASCII编译，\w、\d、\s只查ASCII字符表，结果与Unicode模式相同
+        rules = "|".join(alternatives)
+        self._pattern = re.compile(f"(?={self.chinese_anchor}|(?<!\\w)(?:{self.anchor}))(?:{rules})")
+        self._ascii_pattern = re.compile(f"(?<!\\w)(?={self.anchor})(?:{rules})", re.ASCII)
+        # 每种语言一个替换函数，不再为每次调用创建闭包
+        self._replacers = {is_chinese: self._make_replacer(readers, is_chinese) for is_chinese in (False, True)}
+        self.normalize.cache_clear()
+
+    @staticmethod
+    def _make_replacer(readers, is_chinese):
+        handlers = {}
+        for rule, (handler, pattern) in readers.items():
+            if pattern.groupindex:
+                # 有字段的规则在命中位置用自己的正则再匹配一次，handler直接按分组名取字段
+                handlers[rule] = lambda match, handler=handler, pattern=pattern: \
+                    f" {handler(pattern.match(match.string, match.start()), is_chinese)} "
+            else:
+                handlers[rule] = lambda match, handler=handler: f" {handler(match, is_chinese)} "
+        return lambda match: handlers[match.lastgroup](match)
+
+    def add_rule(self, name, pattern, handler, before="letter"):
+        """
+        添加规则，默认放在通用的字母规则之前；
+        规则须从anchor允许的词首位置开始匹配，以新的关键词开头时需同时扩展anchor（中文关键词扩展chinese_anchor）
+        handler(match, is_chinese) 返回替换后的文本，match为该规则的匹配结果（re.Match），按分组名取字段；
+        返回的文本中的数字最后统一逐位读出
+        """
+        names = [rule.name for rule in self.rules]
+        index = names.index(before) if before in names else len(self.rules)
+        self.rules.insert(index, Rule(name, pattern, handler))
+        self._compile()
+
+    def _normalize(self, text, is_chinese=False):
+        if not text:
+            return text
+        pattern = self._ascii_pattern if text.isascii() else self._pattern
+        result = pattern.sub(self._replacers[is_chinese], text)
+        return " ".join(spell_all_digits(result, is_chinese).split())
+
+
+normalizer = AtisNormalizer()
+
+def process_mixed_atis_text(text):
+    """
+    处理ATIS文本，可以处理纯英文或中英文混合的情况
+    如果文本包含|符号，则认为是中英文混合，英文在前中文在后
+    """
+    if not text:
+        return text
+    
+    # 检查是否有中英文分隔符
+    parts = text.split('|')
+    
+    if len(parts) == 2:
+        # 有中英文分隔的情况
+        english_part = process_single_atis_text(parts[0].strip(), is_chinese=False)
+        chinese_part = process_single_atis_text(parts[1].strip(), is_chinese=True)
+        return f"{english_part}|{chinese_part}"
+    else:
+        # 纯英文的情况
+        return process_single_atis_text(text, is_chinese=False)
+
+def process_single_atis_text(text, is_chinese=False):
+    """
+    处理单一语言的ATIS文本，替换字母和数字为对应的无线电读法
+    is_chinese: 是否为中文ATIS
+    """
+    if not text:
+        return text
+    return normalizer.normalize(text.strip(), is_chinese)
+
+
+def benchmark(rounds=200):
+    """用ATIS语料测量读法转换的吞吐量（条/秒），分别统计未命中和命中缓存的情况"""
+    import time
+
+    corpus = [
+        ("ZSSS ARR ATIS INFORMATION K 0830Z RWY 35L 34R IN USE WIND 03005KT VIS 10KM FEW020 "
+         "TEMP 18 DEWPOINT 12 QNH 1013 EXPECT ILS APPROACH ADVISE ON INITIAL CONTACT YOU HAVE INFORMATION K", False),
+        ("ZBAA ATIS INFORMATION D 1200Z DEP RWY 36R ARR RWY 36L WIND 34012G22KT CAVOK TEMP 25 DEWPOINT 08 "
+         "Q1008 NOSIG", False),
+        ("ZGGG ATIS INFORMATION B 2300Z RWY 01 WIND VRB02MPS VIS 6000 BR SCT008 OVC030 "
+         "TEMP 22 DEWPOINT 21 QNH 1006 TREND TEMPO 3000 SHRA", False),
+        ("KJFK ATIS INFO T 1851Z 31015G25KT 10SM FEW050 A2992 ILS RWY 04R APPROACH IN USE DEPARTING RWY 04L", False),
+        ("上海浦东 情报通播 K 0830Z 跑道 35L 34R 使用中 地面风 03005MPS 能见度 10公里 温度 18 露点 12 QNH 1013", True),
+        ("北京首都 情报通播 D 1200Z 跑道36R 起飞 跑道36L 落地 风 34012G22KT 修正海压 1008", True),
+    ]
+
+    def run(texts):
+        start = time.perf_counter()
+        for text, is_chinese in texts:
+            process_single_atis_text(text, is_chinese)
+        return len(texts) / (time.perf_counter() - start)
+
+    def legacy(text, is_chinese):
+        # 改造前的实现：每次调用都经过re.sub和Python回调逐个替换
+        number_dict = chinese_numbers if is_chinese else english_numbers
+        text = text.strip() + " "
+        text = re.sub(r'\s([A-Z])\s', lambda m: f" {english_characters.get(m.group(1), m.group(1))} ", text)
+        return re.sub(r'\d+', lambda m: " " + " ".join(number_dict[int(d)] for d in m.group(0)) + " ", text)
+
+    # 每条加上不同的时间，保证不命中缓存
+    uncached = [(f"{text} {index:04d}Z", is_chinese) for index in range(rounds) for text, is_chinese in corpus]
+    normalizer.normalize.cache_clear()
+    cold = run(uncached)
+    warm = run(corpus * rounds)
+    start = time.perf_counter()
+    for text, is_chinese in uncached:
+        legacy(text, is_chinese)
+    baseline = len(uncached) / (time.perf_counter() - start)
+    return {"旧实现": baseline, "未命中缓存": cold, "命中缓存": warm, "缓存": normalizer.normalize.cache_info()}
+
+
+if __name__ == "__main__":
+    for key, value in benchmark().items():
+        print(f"{key}: {value:,.0f} 条/秒" if isinstance(value, float) else f"{key}: {value}")
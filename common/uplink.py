@@ -0,0 +1,94 @@
+import struct
+import socket
+from time import time
+
+import opuslib
+from pymumble_py3.soundoutput import SoundOutput
+from pymumble_py3.constants import (
+    PYMUMBLE_AUDIO_TYPE_OPUS,
+    PYMUMBLE_MSG_TYPES_UDPTUNNEL,
+    PYMUMBLE_SAMPLERATE,
+    PYMUMBLE_SEQUENCE_DURATION,
+)
+from pymumble_py3.tools import VarInt
+
+OPUS_TERMINATOR = 0x2000  # Opus帧长度字段中的结束标志位
+
+
+class UplinkSoundOutput(SoundOutput):
+    """
+    在pymumble的SoundOutput基础上支持发送结束帧
+    pymumble从不设置Opus的结束标志，接收端只能靠超时判断对方停止说话；
+    调用end_transmission()后，缓冲区发完时会在pymumble循环线程中补发一个带结束标志的静音帧
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._end_pending = False
+        self._active = False  # 上次结束帧之后是否发送过音频
+        self.terminators_sent = 0
+
+    def add_sound(self, pcm):
+        # 结束帧还没发出去就又开始说话时，继续当前的连续发送
+        self._end_pending = False
+        self._active = True
+        super().add_sound(pcm)
+
+    def end_transmission(self):
+        """标记本次发射结束，可在任意线程调用"""
+        if self._active:
+            self._end_pending = True
+
+    def send_audio(self):
+        result = super().send_audio()
+        if self._end_pending and not self.pcm and self.encoder:
+            if self.sequence_last_time + self.audio_per_packet <= time():
+                self._end_pending = False
+                self._active = False
+                self._send_terminator()
+        return result
+
+    def _send_terminator(self):
+        """发送一个带结束标志的静音帧，序列号紧接上一个包"""
+        if self.codec_type != PYMUMBLE_AUDIO_TYPE_OPUS:
+            return  # CELT没有单独的结束帧
+        self.sequence += int(self.audio_per_packet / PYMUMBLE_SEQUENCE_DURATION)
+        self.sequence_last_time = self.sequence_start_time + (self.sequence * PYMUMBLE_SEQUENCE_DURATION)
+
+        samples = int(self.encoder_framesize * PYMUMBLE_SAMPLERATE)
+        try:
+            encoded = self.encoder.encode(b'\x00' * (samples * 2 * self.channels), samples)
+        except opuslib.exceptions.OpusError:
+            encoded = b''
+
+        payload = VarInt(len(encoded) | OPUS_TERMINATOR).encode() + encoded
+        header = self.codec_type << 5
+        udppacket = struct.pack('!B', header | self.target) + VarInt(self.sequence).encode() + payload
+        if self.mumble_object.positional:
+            udppacket += struct.pack("fff", *self.mumble_object.positional[:3])
+
+        tcppacket = struct.pack("!HL", PYMUMBLE_MSG_TYPES_UDPTUNNEL, len(udppacket)) + udppacket
+        while len(tcppacket) > 0:
+            sent = self.mumble_object.control_socket.send(tcppacket)
+            if sent < 0:
+                raise socket.error("Server socket error")
+            tcppacket = tcppacket[sent:]
+        self.terminators_sent += 1
+
+
+def install_uplink(mumble):
+    """
+    让mumble使用UplinkSoundOutput，需在mumble.start()之前调用
+    pymumble在每次（重新）连接时的init_connection()中创建发送对象，因此在那之后替换
+    """
+    init_connection = mumble.init_connection
+
+    def init_uplink_connection():
+        init_connection()
+        current = mumble.sound_output
+        mumble.sound_output = UplinkSoundOutput(
+            mumble, current.get_audio_per_packet(), current.get_bandwidth(),
+            stereo=current.channels == 2, opus_profile=current.opus_profile
+        )
+
+    mumble.init_connection = init_uplink_connection
@@ -5,96 +5,18 @@ import wave
 import numpy as np
 import os
 import tempfile
-from scipy import signal
-import re
-
-chinese_numbers = {
-    0: "洞",
-    1: "幺",
-    2: "两",
-    3: "三",
-    4: "四",
-    5: "五",
-    6: "六",
-    7: "拐",
-    8: "八",
-    9: "九",
-}
-
-english_numbers = {
-    0: "zero",
-    1: "one",
-    2: "two",
-    3: "three",
-    4: "four",
-    5: "five",
-    6: "six",
-    7: "seven",
-    8: "eight",
-    9: "niner",
-}
-
-english_characters = {
-    "A": "Alpha",
-    "B": "Bravo",
-    "C": "Charlie",
-    "D": "Delta",
-    "E": "Echo",
-    "F": "Foxtrot",
-    "G": "Golf",
-    "H": "Hotel",
-    "I": "India",
-    "J": "Juliett",
-    "K": "Kilo",
-    "L": "Lima",
-    "M": "Mike",
-    "N": "November",
-    "O": "Oscar",
-    "P": "Papa",
-    "Q": "Quebec",
-    "R": "Romeo",
-    "S": "Sierra",
-    "T": "Tango",
-    "U": "Uniform",
-    "V": "Victor",
-    "W": "Whiskey",
-    "X": "X-ray",
-    "Y": "Yankee",
-    "Z": "Zulu"
-}
-
-def process_atis_text(text, is_chinese=False):
-    """
-    处理ATIS文本，替换字母和数字为对应的无线电读法
-    is_chinese: 是否为中文ATIS
-    """
-    if not text:
-        return text
-        
-    # 选择对应的数字读法字典
-    number_dict = chinese_numbers if is_chinese else english_numbers
-    
-    # 处理空格+大写字母+空格的模式
-    def replace_letter(match):
-        letter = match.group(1)
-        return f" {english_characters.get(letter, letter)} "
-    
-    text = re.sub(r'\s([A-Z])\s', replace_letter, text)
-    
-    # 处理数字
-    def replace_number(match):
-        number = match.group(0)
-        number_text = " ".join(number_dict[int(digit)] for digit in number)
-        return f" {number_text} "
-    
-    text = re.sub(r'\d+', replace_number, text)
-    return text
+from common.pacer import FramePacer
+from common.pcm import PcmBuffer, FRAME_DURATION
+from common.dsp import DspChain, AGC, SoftLimiter
+from resample import resample
+from common.process import process_single_atis_text
 
 class ATISBroadcaster:
     def __init__(self, chinese_text, english_text, radio_client):
         print("初始化ATIS广播器...")
-        self.chinese_text = process_atis_text(chinese_text, is_chinese=True) if chinese_text else ""
-        self.english_text = process_atis_text(english_text, is_chinese=False)
+        self._audio_cache = {}  # 处理后文本 -> 48kHz PCM，每段文本只合成一次
+        self._render_lock = threading.Lock()  # pyttsx3 非线程安全，同一时间只允许一次合成
+        self._render_thread = None
         self.radio_client = radio_client
         self.running = False
         self.broadcast_thread = None
@@ -108,12 +30,50 @@ class ATISBroadcaster:
         self.temp_dir = tempfile.mkdtemp()
         print(f"创建临时目录: {self.temp_dir}")
         print("ATIS广播器初始化完成")
-        self.chunk_size = 960000
-        self.silence_threshold = 100  # 音量阈值，低于此值视为静音
         self.silence_duration = 1.0  # 持续静音时间阈值（秒）
-        self.last_sound_time = time.time()
         # 新增：用于可中断等待
         self.stop_event = threading.Event()
+        self.pacer = FramePacer(FRAME_DURATION)
+        # TTS音量统一：自动增益到目标电平，再软限幅防止削波
+        self.dsp = DspChain([AGC(), SoftLimiter()])
+        # 合成依赖上面的引擎和临时目录，放在最后设置内容
+        self.set_text(chinese_text, english_text)
+
+    def set_text(self, chinese_text, english_text):
+        """设置通播内容，新内容在后台线程中合成一次，播放循环只重放已合成的音频"""
+        self.chinese_text = process_single_atis_text(chinese_text, is_chinese=True) if chinese_text else ""
+        self.english_text = process_single_atis_text(english_text, is_chinese=False)
+        self.render_async()
+
+    def render_async(self):
+        """在后台线程中合成当前通播内容"""
+        self._render_thread = threading.Thread(target=self.prerender, daemon=True)
+        self._render_thread.start()
+
+    def rendered(self):
+        """当前通播内容是否都已合成完毕"""
+        return all(text in self._audio_cache for text in (self.chinese_text, self.english_text) if text)
+
+    def audio_for(self, text):
+        """返回文本对应的PCM，已合成过的直接使用内存中的结果"""
+        if not text:
+            return None
+        audio = self._audio_cache.get(text)
+        if audio is None:
+            audio = self.text_to_audio_data(text)
+            if audio:
+                # 只保留当前通播内容的音频，旧内容的音频随即释放
+                current = (self.chinese_text, self.english_text)
+                for key in [key for key in self._audio_cache if key not in current]:
+                    del self._audio_cache[key]
+                self._audio_cache[text] = audio
+        return audio
+
+    def prerender(self):
+        """提前合成当前通播内容，播放循环中不再运行TTS"""
+        with self._render_lock:
+            for text in (self.chinese_text, self.english_text):
+                self.audio_for(text)
 
     # 新增：根据字节长度计算音频时长（int16 PCM 单声道）
     def calc_duration(self, bytes_len: int) -> float:
@@ -180,11 +140,8 @@ class ATISBroadcaster:
             # 计算重采样
             if original_rate != self.target_rate:
                 print(f"重采样音频从 {original_rate}Hz 到 {self.target_rate}Hz")
-                samples_count = len(audio_array)
-                new_samples_count = int(samples_count * (self.target_rate / original_rate))
-                audio_array = signal.resample(audio_array, new_samples_count)
-                # 确保数据类型正确
-                audio_array = np.clip(audio_array, np.iinfo(np.int16).min, np.iinfo(np.int16).max).astype(np.int16)
+                # 分块多相滤波，滤波器按采样率对缓存，边缘没有FFT方法的振铃
+                audio_array = resample(audio_array, original_rate, self.target_rate)
             
             if len(audio_array) == 0:
                 raise ValueError("重采样后的音频数组为空")
@@ -196,8 +153,8 @@ class ATISBroadcaster:
             except Exception as e:
                 print(f"删除临时文件失败: {e}")
                 
-            # 转换回字节
-            audio_data = audio_array.tobytes()
+            # 转换回字节，同时统一音量
+            audio_data = self.dsp.render(audio_array)
             if not audio_data:
                 raise ValueError("无法将音频数组转换为字节数据")
                 
@@ -218,31 +175,11 @@ class ATISBroadcaster:
             print(f"清理临时目录失败: {e}")
 
     def check_channel_silence(self):
-        """检查频道是否处于静音状态"""
+        """检查本频道是否已持续静音，只查询接收端的活动监测器，不读取其他用户的音频队列"""
         try:
-            current_time = time.time()
-            for user in self.radio_client.mumble.users.values():
-                if user["name"] != self.radio_client.mumble.users.myself["name"]:
-                    try:
-                        sound = user.get("sound")
-                        if sound is None:
-                            continue
-                            
-                        audio_data = sound.get_sound(10)
-                        if audio_data is None or len(audio_data) == 0:
-                            continue
-                            
-                        audio_array = np.frombuffer(audio_data, dtype=np.int16)
-                        if len(audio_array) > 0:
-                            volume = np.abs(audio_array).mean()
-                            if volume > self.silence_threshold:
-                                self.last_sound_time = current_time
-                                return False
-                    except Exception as e:
-                        print(f"检查用户 {user['name']} 音频时出错: {e}")
-                        continue
-                        
-            return (current_time - self.last_sound_time) >= self.silence_duration
+            mumble = self.radio_client.mumble
+            channel_id = mumble.users.myself.get("channel_id", 0)
+            return self.radio_client.activity.is_silent(channel_id, self.silence_duration)
         except Exception as e:
             print(f"检查频道音量时出错: {e}")
             return True  # 出错时默认允许发送
@@ -254,66 +191,64 @@ class ATISBroadcaster:
             return False
             
         print(f"开始发送音频数据，总大小: {len(audio_data)} 字节")
-        position = 0
-        total_size = len(audio_data)
+        buffer = PcmBuffer(audio_data)
+        total_frames = len(buffer)
         chunks_sent = 0
-        send_start_time = time.time()
+        self.pacer.reset()
         
         try:
-            self.radio_client.start_speaking()
+            # 只占用发送，不启动麦克风线程
+            self.radio_client.begin_playout()
             print("已开启语音发送状态")
 
-            while position < total_size and self.running:
+            while chunks_sent < total_frames and self.running:
                 # 检查频道是否有其他声音
                 if not self.check_channel_silence():
                     print("检测到频道有其他音频，暂停发送")
                     # 将阻塞睡眠改为可中断等待
                     if self.stop_event.wait(0.5):
                         break
+                    self.pacer.reset()
                     continue
 
-                remaining = total_size - position
-                current_chunk_size = min(self.chunk_size, remaining)
-                
-                chunk = audio_data[position:position + current_chunk_size]
-                if not chunk:  # 检查切片后的数据是否为空
-                    print("警告: 生成了空的音频块")
+                # 按单调时钟节拍发送，补偿处理耗时带来的漂移
+                if not self.pacer.wait(self.stop_event):
                     break
 
-                if len(chunk) < current_chunk_size:
-                    chunk = chunk + b'\x00' * (current_chunk_size - len(chunk))
-                
-                self.radio_client.mumble.sound_output.add_sound(chunk)
-                position += current_chunk_size
+                # 每次只送入恰好一个编码帧，opuslib只接受bytes，此处才复制
+                self.radio_client.mumble.sound_output.add_sound(bytes(buffer.frame(chunks_sent)))
                 chunks_sent += 1
                 
-                if chunks_sent % 10 == 0:
-                    print(f"已发送 {position}/{total_size} 字节 ({(position/total_size*100):.1f}%)")
-                
-                # 将阻塞睡眠改为可中断等待
-                if self.stop_event.wait(0.02):
-                    break
+                if chunks_sent % 50 == 0:
+                    print(f"已发送 {chunks_sent}/{total_frames} 帧 ({(chunks_sent/total_frames*100):.1f}%)")
 
-            print(f"音频发送完成，共发送了 {chunks_sent} 个音频块")
+            print(f"音频发送完成，共发送了 {chunks_sent} 个音频块，节拍统计: {self.pacer.stats()}")
             return True
 
         except Exception as e:
             print(f"音频发送错误: {str(e)}")
             return False
         finally:
-            self.radio_client.stop_speaking()
+            self.radio_client.end_playout()
 
 
     def _broadcast_loop(self):
         print("开始ATIS广播循环")
         while self.running and not self.stop_event.is_set():
+            if not self.rendered():
+                # 新内容仍在后台合成，等待而不在循环内运行TTS；合成失败则重新提交
+                if self._render_thread is None or not self._render_thread.is_alive():
+                    self.render_async()
+                if self.stop_event.wait(0.5):
+                    break
+                continue
             try:
                 with self.lock:
                     total_duration = 0.0
                     if self.check_channel_silence():
                         if self.chinese_text:
                             print("\n开始播放中文ATIS...")
-                            chinese_audio = self.text_to_audio_data(self.chinese_text)
+                            chinese_audio = self._audio_cache.get(self.chinese_text)
                             if not self.running or self.stop_event.is_set():
                                 break
                             if chinese_audio:
@@ -324,7 +259,7 @@ class ATISBroadcaster:
 
                         if self.check_channel_silence():
                             print("\n开始播放英文ATIS...")
-                            english_audio = self.text_to_audio_data(self.english_text)
+                            english_audio = self._audio_cache.get(self.english_text)
                             if not self.running or self.stop_event.is_set():
                                 break
                             if english_audio:
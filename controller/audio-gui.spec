@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['gui.py'],
-    pathex=[],
+    pathex=['..'],  # 仓库根目录，包含共用的common包
     binaries=[],
     datas=[],
     hiddenimports=[],
@@ -1,3 +1,7 @@
+import os
+import sys
+# 与飞行员客户端、ATIS服务器共用的模块在仓库根目录的common包中
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                          QHBoxLayout, QLabel, QPushButton, QLineEdit, 
                          QStackedWidget, QFrame,  QMessageBox,
@@ -292,6 +296,7 @@ class ATCWindow(QMainWindow):
             # 设置初始音量
             self.radio_client.set_mic_volume(self.settings.mic_volume)
             self.radio_client.set_speaker_volume(self.settings.speaker_volume)
+            self.radio_client.set_jitter_robustness(self.settings.jitter_robustness)
             self.radio_client.start()
             self.freq_display.setText(f'当前频率: {frequency}')
             self.stacked_widget.setCurrentIndex(1)
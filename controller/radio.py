@@ -3,9 +3,12 @@ import keyboard
 import pyaudio
 import threading
 import time
-import numpy as np
 from contextlib import contextmanager
 from pymumble_py3.errors import ConnectionRejectedError
+from common.mixer import Mixer
+from common.dsp import DspChain, GainKernel, NoiseGate, SoftLimiter, VAD
+from common.uplink import install_uplink
+from common.activity import ChannelActivityMonitor
 
 server = "118.153.226.153"
 
@@ -24,14 +27,18 @@ class ATCRadioClient:
             user = f"{base_user}_atis{str(freq_value).zfill(6)}"
         
         self.mumble = pymumble.Mumble(server, user, password=password, reconnect=True)
+        # 发送结束时补发带结束标志的帧，接收端不用等超时
+        install_uplink(self.mumble)
         self.mumble.set_receive_sound(True)  # 启用音频接收
         self.mumble.callbacks.set_callback(pymumble.constants.PYMUMBLE_CLBK_SOUNDRECEIVED, self.sound_received)  # 设置音频接收回调
+        self.mumble.callbacks.set_callback(pymumble.constants.PYMUMBLE_CLBK_USERREMOVED, self.user_removed)
         self.mumble.callbacks.set_callback("connected", self.on_connected)
         self.connected = False  # 初始化连接状态
         self.audio = pyaudio.PyAudio()
         self.input_stream = None
         self.output_stream = None
         self.speaking = False
+        self.playout = False  # 正在发送预先生成的音频（ATIS），由begin_playout/end_playout管理
         self.current_channel = None  # 添加初始化
         self.CHUNK = 960  # 20ms @ 48000Hz
         self.FORMAT = pyaudio.paInt16
@@ -39,7 +46,17 @@ class ATCRadioClient:
         self.RATE = 48000
         self.mic_volume = 1.0
         self.speaker_volume = 1.0
+        # 麦克风：音量、语音检测、噪声门、软限幅；扬声器：音量、软限幅
+        self.mic_gain = GainKernel(self.mic_volume)
+        self.mic_vad = VAD()  # 发射期间只发送检测到语音的帧
+        self.mic_chain = DspChain([self.mic_gain, self.mic_vad, NoiseGate(), SoftLimiter()], self.CHUNK)
+        self.speaker_gain = GainKernel(self.speaker_volume)
+        self.speaker_chain = DspChain([self.speaker_gain, SoftLimiter()], self.CHUNK)
         self._stream_lock = threading.Lock()
+        # 接收的音频按用户写入混音器，由声卡回调混合后播放
+        self.mixer = Mixer(self.RATE)
+        # 按频道统计接收电平，ATIS据此判断频道是否有人说话
+        self.activity = ChannelActivityMonitor()
 
     @contextmanager
     def _safe_audio_stream(self, stream):
@@ -134,12 +151,21 @@ class ATCRadioClient:
                     format=self.FORMAT,
                     channels=self.CHANNELS,
                     rate=self.RATE,
-                    frames_per_buffer=self.CHUNK
+                    frames_per_buffer=self.CHUNK,
+                    stream_callback=self._playback_callback
                 )
             except Exception as e:
                 print(f"设置音频设备失败: {e}")
                 raise
 
+    def _playback_callback(self, in_data, frame_count, time_info, status):
+        """声卡回调：混合所有正在说话的用户，数据不足时补静音"""
+        return (self.speaker_chain.process_array(self.mixer.mix(frame_count)).tobytes(), pyaudio.paContinue)
+
+    def get_playback_stats(self):
+        """返回混音和抖动缓冲区的统计"""
+        return self.mixer.stats()
+
     def start_speaking(self):
         if not self.speaking:
             self.speaking = True
@@ -148,28 +174,52 @@ class ATCRadioClient:
     def stop_speaking(self):
         self.speaking = False
 
+    def begin_playout(self):
+        """开始发送预先生成的音频（ATIS），不启动麦克风线程，音频由调用方逐帧add_sound"""
+        self.playout = True
+
+    def end_playout(self):
+        """结束音频发送并补发结束帧，只由begin_playout的调用方调用"""
+        self.playout = False
+        self.mumble.sound_output.end_transmission()
+
     def set_mic_volume(self, volume_percent):
         """设置麦克风音量 (0-200)"""
         self.mic_volume = max(0.0, min(2.0, volume_percent / 100.0))
+        self.mic_gain.set_gain(self.mic_volume)
         print(f"麦克风音量已设置为: {volume_percent}%")
 
     def set_speaker_volume(self, volume_percent):
         """设置扬声器音量 (0-200)"""
         self.speaker_volume = max(0.0, min(2.0, volume_percent / 100.0))
+        self.speaker_gain.set_gain(self.speaker_volume)
         print(f"扬声器音量已设置为: {volume_percent}%")
 
+    def set_jitter_robustness(self, percent):
+        """设置接收抖动缓冲的抗抖动程度 (0-100)，越高越稳定但延迟越大"""
+        self.mixer.set_robustness(max(0.0, min(1.0, percent / 100.0)))
+        print(f"抗抖动程度已设置为: {percent}%")
+
     def _audio_thread(self):
+        self.mic_chain.reset()
+        transmitting = False  # 只结束麦克风自己开始的发送
         while self.speaking:
             try:
                 with self._safe_audio_stream(self.input_stream) as stream:
                     data = stream.read(self.CHUNK, exception_on_overflow=False)
                     if data:
-                        # 使用numpy处理音频数据
-                        audio_data = np.frombuffer(data, dtype=np.int16)
-                        # 应用音量调节（添加限幅以防止溢出）
-                        scaled_data = audio_data * self.mic_volume 
-                        audio_data = np.clip(scaled_data, np.iinfo(np.int16).min, np.iinfo(np.int16).max).astype(np.int16)
-                        self.mumble.sound_output.add_sound(audio_data.tobytes())
+                        # 经过麦克风处理链（音量、语音检测、噪声门、软限幅）
+                        audio_data = self.mic_chain.process(data)
+                        if self.mic_vad.speech and not self.playout:
+                            # pymumble会保存传入的数据，这里复制一份，处理链的缓冲区下一帧继续复用
+                            self.mumble.sound_output.add_sound(bytes(audio_data))
+                            transmitting = True
+                        elif transmitting:
+                            # 背景噪声不发送；刚从语音转为静音时结束本段发送，
+                            # 发送已交给ATIS播放时不结束它的发送
+                            transmitting = False
+                            if not self.playout:
+                                self.mumble.sound_output.end_transmission()
             except AudioStreamError:
                 time.sleep(0.1)  # 音频流错误时短暂等待
                 continue
@@ -177,6 +227,9 @@ class ATCRadioClient:
                 print(f"录音错误: {e}")
                 time.sleep(0.1)
             time.sleep(0.001)  # 防止CPU过载
+        # 停止发射后补发结束帧
+        if transmitting and not self.playout:
+            self.mumble.sound_output.end_transmission()
 
     def sound_received(self, user, soundchunk):
         """处理接收到的音频"""
@@ -187,21 +240,19 @@ class ATCRadioClient:
             return  # 忽略无效的音频数据
 
         try:
-            with self._safe_audio_stream(self.output_stream) as stream:
-                # 使用numpy处理接收到的音频
-                audio_data = np.frombuffer(soundchunk.pcm, dtype=np.int16)
-                if len(audio_data) == 0:
-                    return  # 忽略空的音频数据
-                    
-                # 应用音量调节（添加限幅以防止溢出）
-                scaled_data = audio_data * self.speaker_volume
-                audio_data = np.clip(scaled_data, np.iinfo(np.int16).min, np.iinfo(np.int16).max).astype(np.int16)
-                stream.write(audio_data.tobytes())
-        except AudioStreamError:
-            pass  # 忽略音频流错误，等待下一个音频块
+            if len(soundchunk.pcm) == 0:
+                return  # 忽略空的音频数据
+            self.activity.on_sound(user, soundchunk)
+            # 回调运行在pymumble的循环线程中，只写入缓冲区，不阻塞在声卡上；
+            # 收听音量在声卡回调中对混音结果统一调整，这里不做处理也不复制数据
+            self.mixer.add(user["session"], soundchunk.sequence, soundchunk.pcm)
         except Exception as e:
             print(f"处理接收音频时出错: {e}")
 
+    def user_removed(self, user, message):
+        """用户断开时立即丢弃其抖动缓冲区，不等空闲超时"""
+        self.mixer.remove(user["session"])
+
     def stop(self):
         if self.input_stream:
             self.input_stream.stop_stream()
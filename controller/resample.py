@@ -0,0 +1,173 @@
+import functools
+from math import gcd
+
+import numpy as np
+
+ZERO_CROSSINGS = 16  # 原型滤波器每侧的过零点数，越大过渡带越窄
+KAISER_BETA = 8.6  # 约80dB阻带衰减
+ROLLOFF = 0.94  # 截止频率相对奈奎斯特频率的比例，留出过渡带
+CHUNK_SAMPLES = 4096  # 整段重采样时每次处理的输入样本数，决定内存占用上限
+
+
+@functools.lru_cache(maxsize=16)
+def design_filter(src_rate, dst_rate):
+    """
+    设计(src_rate, dst_rate)对应的多相滤波器，结果按采样率对缓存
+    返回 (up, down, coefs)，coefs[p]是第p相的系数（已反序，可直接与输入窗口做点积）
+    """
+    divisor = gcd(src_rate, dst_rate)
+    up, down = dst_rate // divisor, src_rate // divisor
+    taps = 2 * ZERO_CROSSINGS * max(1, -(-down // up))  # 每相抽头数
+    length = taps * up
+
+    # 在上采样后的采样率下设计低通：截止频率取两个奈奎斯特频率中较低的一个；
+    # 用奇数长度使中心落在整数位置，末尾补一个0凑成每相等长
+    cutoff = ROLLOFF * 0.5 / max(up, down)
+    n = np.arange(length - 1) - (length - 2) / 2.0
+    prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length - 1, KAISER_BETA)
+    prototype *= up / prototype.sum()  # 补偿插零带来的能量损失，直流增益为1
+    prototype = np.append(prototype, 0.0)
+
+    coefs = prototype.reshape(taps, up).T[:, ::-1].astype(np.float32)
+    coefs.setflags(write=False)
+    return up, down, np.ascontiguousarray(coefs)
+
+
+class Resampler:
+    """
+    有理数比例的流式多相重采样器
+    按块输入int16单声道音频，输出对应的int16音频；只保留滤波器长度的历史样本，内存占用与总长度无关
+    输出相对输入有固定的滤波器延迟，flush()把尾部剩余的音频输出
+    """
+
+    def __init__(self, src_rate, dst_rate):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.up, self.down, self.coefs = design_filter(src_rate, dst_rate)
+        self.taps = self.coefs.shape[1]
+        # 滤波器中心（上采样后的单位）；起始相位取余数，使延迟恰好是delay个输出样本
+        center = (self.taps * self.up - 2) // 2
+        self.delay = center // self.down
+        self._start = center - self.delay * self.down
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._pos = self._start  # 下一个输出样本相对当前块第一个输入样本的位置（上采样后的单位）
+
+    def process(self, samples):
+        """输入一块int16（数组或bytes），返回这一块能产生的全部输出样本"""
+        if not isinstance(samples, np.ndarray):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        count = len(samples)
+        if count == 0:
+            return np.zeros(0, dtype=np.int16)
+
+        buffer = np.concatenate([self._history, samples.astype(np.float32)])
+        limit = count * self.up
+        outputs = max(0, -(-(limit - self._pos) // self.down))
+        positions = self._pos + np.arange(outputs, dtype=np.int64) * self.down
+
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, self.taps)
+        result = np.einsum("ij,ij->i", windows[positions // self.up], self.coefs[positions % self.up])
+
+        self._pos += outputs * self.down - limit
+        self._history = buffer[count:].copy()
+        np.rint(result, out=result)
+        np.clip(result, -32768, 32767, out=result)
+        return result.astype(np.int16)
+
+    def flush(self):
+        """输入滤波器长度的静音，把仍在滤波器中的尾部音频输出，然后复位"""
+        tail = self.process(np.zeros(self.taps, dtype=np.int16))
+        self.reset()
+        return tail
+
+
+def resample(samples, src_rate, dst_rate):
+    """
+    整段重采样int16单声道音频，分块处理，输出长度为 round(len * dst / src)，已补偿滤波器延迟
+    """
+    if not isinstance(samples, np.ndarray):
+        samples = np.frombuffer(samples, dtype=np.int16)
+    if src_rate == dst_rate:
+        return samples.astype(np.int16)
+
+    resampler = Resampler(src_rate, dst_rate)
+    expected = int(round(len(samples) * dst_rate / src_rate))
+    skip = resampler.delay
+    result = np.empty(expected, dtype=np.int16)
+    filled = 0
+
+    def collect(block):
+        nonlocal skip, filled
+        if skip:
+            dropped = min(skip, len(block))
+            block = block[dropped:]
+            skip -= dropped
+        take = min(len(block), expected - filled)
+        result[filled:filled + take] = block[:take]
+        filled += take
+
+    for start in range(0, len(samples), CHUNK_SAMPLES):
+        collect(resampler.process(samples[start:start + CHUNK_SAMPLES]))
+    while filled < expected:
+        collect(resampler.flush())
+    return result
+
+
+def benchmark(seconds=10.0, src_rate=22050, dst_rate=48000, repeat=3):
+    """与scipy.signal.resample（整段FFT）比较耗时、峰值内存和精度"""
+    import time
+    import tracemalloc
+
+    t = np.arange(int(seconds * src_rate)) / src_rate
+    # 语音频段内的多个正弦，便于与理想结果比较
+    tones = (440.0, 1250.0, 3100.0)
+    signal_in = sum(np.sin(2 * np.pi * f * t) for f in tones) / len(tones) * 20000
+    pcm = signal_in.astype(np.int16)
+    t_out = np.arange(int(round(len(pcm) * dst_rate / src_rate))) / dst_rate
+    ideal = sum(np.sin(2 * np.pi * f * t_out) for f in tones) / len(tones) * 20000
+
+    def measure(func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        # 跳过两端滤波器暖机的部分
+        edge = int(0.02 * dst_rate)
+        error = np.abs(out[edge:-edge].astype(np.float64) - ideal[edge:-edge]).max()
+        return best, peak, error
+
+    results = {"polyphase": measure(lambda: resample(pcm, src_rate, dst_rate))}
+
+    def streaming():
+        resampler = Resampler(src_rate, dst_rate)
+        blocks = [resampler.process(pcm[i:i + 441]) for i in range(0, len(pcm), 441)]
+        blocks.append(resampler.flush())
+        skip = resampler.delay
+        return np.concatenate(blocks)[skip:skip + len(t_out)]
+
+    results["polyphase(20ms块)"] = measure(streaming)
+    try:
+        from scipy import signal as scipy_signal
+
+        def fft():
+            out = scipy_signal.resample(pcm, len(t_out))
+            return np.clip(out, -32768, 32767).astype(np.int16)
+
+        results["scipy.signal.resample"] = measure(fft)
+    except ImportError:
+        pass
+    return results
+
+
+if __name__ == "__main__":
+    for name, (elapsed, peak, error) in benchmark().items():
+        print(f"{name:24s} {elapsed * 1000:8.1f} ms  峰值内存 {peak / 1024:8.0f} KB  最大误差 {error:6.1f}")
@@ -11,6 +11,7 @@ class Settings:
         self.ptt_key = "v"
         self.mic_volume = 100
         self.speaker_volume = 100
+        self.jitter_robustness = 50  # 接收抖动缓冲：0为最低延迟，100为最强抗抖动
         self.input_device_index = None
         self.output_device_index = None
         self.last_username = ""
@@ -25,6 +26,7 @@ class Settings:
                     self.ptt_key = data.get("ptt_key", "v")
                     self.mic_volume = data.get("mic_volume", 100)
                     self.speaker_volume = data.get("speaker_volume", 100)
+                    self.jitter_robustness = data.get("jitter_robustness", 50)
                     self.input_device_index = data.get("input_device_index", None)
                     self.output_device_index = data.get("output_device_index", None)
                     self.last_username = data.get("last_username", "")
@@ -38,6 +40,7 @@ class Settings:
                 "ptt_key": self.ptt_key,
                 "mic_volume": self.mic_volume,
                 "speaker_volume": self.speaker_volume,
+                "jitter_robustness": self.jitter_robustness,
                 "input_device_index": self.input_device_index,
                 "output_device_index": self.output_device_index,
                 "last_username": self.last_username,
@@ -89,6 +92,22 @@ class SettingsDialog(QDialog):
         speaker_layout.addWidget(self.speaker_value)
         volume_group.addLayout(speaker_layout)
 
+        # 接收抖动缓冲设置
+        jitter_layout = QHBoxLayout()
+        jitter_label = QLabel("抗抖动程度:")
+        self.jitter_slider = QSlider(Qt.Orientation.Horizontal)
+        self.jitter_slider.setRange(0, 100)  # 0为最低延迟，100为最强抗抖动
+        self.jitter_slider.setValue(self.settings.jitter_robustness)
+        self.jitter_value = QLabel(f"{self.settings.jitter_robustness}%")
+        jitter_layout.addWidget(jitter_label)
+        jitter_layout.addWidget(self.jitter_slider)
+        jitter_layout.addWidget(self.jitter_value)
+        volume_group.addLayout(jitter_layout)
+
+        # 已连接时显示当前的接收缓冲状态
+        self.playback_stats = QLabel(self.describe_playback())
+        volume_group.addWidget(self.playback_stats)
+
         # PTT按键设置
         ptt_layout = QHBoxLayout()
         ptt_label = QLabel("PTT按键:")
@@ -128,6 +147,8 @@ class SettingsDialog(QDialog):
             lambda v: self.mic_value.setText(f"{v}%"))
         self.speaker_slider.valueChanged.connect(
             lambda v: self.speaker_value.setText(f"{v}%"))
+        self.jitter_slider.valueChanged.connect(
+            lambda v: self.jitter_value.setText(f"{v}%"))
         save_button.clicked.connect(self.save_and_close)
         cancel_button.clicked.connect(self.reject)
 
@@ -140,6 +161,15 @@ class SettingsDialog(QDialog):
         layout.addStretch()
         self.setLayout(layout)
 
+    def describe_playback(self):
+        """接收缓冲的统计，未连接时为空"""
+        parent = self.parent()
+        if not parent or not getattr(parent, "radio_client", None):
+            return ""
+        stats = parent.radio_client.get_playback_stats()
+        return (f"接收缓冲: {stats['buffered_ms']:.0f}ms / 目标 {stats['target_ms']:.0f}ms，"
+                f"补偿 {stats['concealed']} 帧，迟到 {stats['late']} 帧，欠载 {stats['underruns']} 次")
+
     def populate_audio_devices(self, combo_box, is_input):
         """填充音频设备下拉列表"""
         import pyaudio
@@ -205,6 +235,7 @@ class SettingsDialog(QDialog):
         self.settings.ptt_key = self.ptt_input.text() or "v"
         self.settings.mic_volume = self.mic_slider.value()
         self.settings.speaker_volume = self.speaker_slider.value()
+        self.settings.jitter_robustness = self.jitter_slider.value()
         self.settings.input_device_index = self.input_combo.currentData()
         self.settings.output_device_index = self.output_combo.currentData()
         self.settings.save_settings()
@@ -214,5 +245,6 @@ class SettingsDialog(QDialog):
         if parent and parent.radio_client:
             parent.radio_client.set_mic_volume(self.settings.mic_volume)
             parent.radio_client.set_speaker_volume(self.settings.speaker_volume)
+            parent.radio_client.set_jitter_robustness(self.settings.jitter_robustness)
 
         self.accept()
\ No newline at end of file
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class AudioCache:
+    """
+    TTS音频缓存，按(处理后文本, 语音, 采样率)寻址
+    内存层为按字节预算淘汰的LRU，磁盘层保存PCM文件，重启后仍可命中
+    """
+
+    def __init__(self, cache_dir="atis_cache", max_bytes=64 * 1024 * 1024, max_disk_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()  # key -> pcm bytes，末尾为最近使用
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_size = 0  # 磁盘层的总字节数，启动时统计一次，之后随写入和清理更新
+        self._disk_lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_size = sum(size for _, size, _ in self._scan_disk())
+
+    @staticmethod
+    def make_key(text, voice, sample_rate):
+        """根据文本内容、语音和采样率生成缓存键"""
+        digest = hashlib.sha256()
+        digest.update(f"{voice}\0{sample_rate}\0{text}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pcm")
+
+    def get(self, text, voice, sample_rate):
+        """返回缓存的PCM数据，未命中时返回None"""
+        key = self.make_key(text, voice, sample_rate)
+        with self._lock:
+            pcm = self._entries.get(key)
+            if pcm is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pcm
+
+        pcm = self._read_disk(key)
+        with self._lock:
+            if pcm is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, pcm)
+        return pcm
+
+    def put(self, text, voice, sample_rate, pcm):
+        """写入PCM数据到内存和磁盘"""
+        if not pcm:
+            return
+        pcm = bytes(pcm)
+        key = self.make_key(text, voice, sample_rate)
+        with self._lock:
+            self._store(key, pcm)
+        self._write_disk(key, pcm)
+
+    def _store(self, key, pcm):
+        """写入内存层并按字节预算淘汰最久未使用的条目（调用方持有锁）"""
+        if len(pcm) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = pcm
+        self._size += len(pcm)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                pcm = f.read()
+            os.utime(path)  # 更新访问时间，供磁盘层淘汰使用
+            return pcm or None
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"读取音频缓存失败: {e}")
+            return None
+
+    def _write_disk(self, key, pcm):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(pcm)
+            os.replace(temp_path, path)  # 原子替换，避免读到写了一半的文件
+        except OSError as e:
+            print(f"写入音频缓存失败: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self._disk_lock:
+            self._disk_size += len(pcm) - old_size
+            over = self._disk_size > self.max_disk_bytes
+        # 只有累计大小超出预算时才扫描目录
+        if over:
+            self._prune_disk()
+
+    def _scan_disk(self):
+        """磁盘层的全部缓存文件：[(修改时间, 大小, 路径)]"""
+        files = []
+        try:
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(".pcm"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            print(f"扫描音频缓存失败: {e}")
+        return files
+
+    def _prune_disk(self):
+        """
+        磁盘层超出预算时删除最久未使用的文件，删到预算的90%以下，
+        之后要再写入一段才会再次清理；总字节数按扫描结果校正
+        """
+        with self._disk_lock:
+            files = self._scan_disk()
+            total = sum(size for _, size, _ in files)
+            if total > self.max_disk_bytes:
+                files.sort()
+                for _, size, path in files:
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except FileNotFoundError:
+                        total -= size
+                    except OSError as e:
+                        print(f"清理音频缓存失败: {e}")
+                    if total <= self.max_disk_bytes * 0.9:
+                        break
+            self._disk_size = total
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk_bytes": self._disk_size,
+            }
@@ -0,0 +1,40 @@
+import av
+
+
+class StreamDecoder:
+    """
+    流式MP3解码器
+    边接收edge-tts的音频块边解码，直接在内存中输出单声道int16 PCM，不启动子进程也不写临时文件
+    """
+
+    def __init__(self, sample_rate=48000, codec_name="mp3"):
+        self.codec = av.CodecContext.create(codec_name, "r")
+        self.resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+        self.pcm = bytearray()
+
+    def feed(self, data):
+        """送入一段压缩音频数据，解码出的PCM追加到缓冲区"""
+        for packet in self.codec.parse(data):
+            self._decode(packet)
+
+    def finish(self):
+        """冲刷解析器、解码器和重采样器，返回完整的PCM数据"""
+        for packet in self.codec.parse(None):
+            self._decode(packet)
+        self._decode(None)
+        self._append(self.resampler.resample(None))
+        return bytes(self.pcm)
+
+    def _decode(self, packet):
+        try:
+            frames = self.codec.decode(packet)
+        except av.error.InvalidDataError:
+            return  # 跳过ID3标签等无法解码的数据
+        for frame in frames:
+            self._append(self.resampler.resample(frame))
+
+    def _append(self, frames):
+        for frame in frames:
+            # s16 单声道为packed格式，to_ndarray形状为(1, samples)
+            self.pcm += frame.to_ndarray().tobytes()
+
@@ -0,0 +1,117 @@
+import asyncio
+import json
+from collections import namedtuple
+
+import aiohttp
+
+import request
+
+ATIS_ADDED = "added"
+ATIS_REMOVED = "removed"
+ATIS_CHANGED = "changed"
+
+AtisEvent = namedtuple("AtisEvent", ["kind", "callsign", "atis"])
+
+
+def atis_raw_text(atis):
+    """拼接ATIS的原始文本行"""
+    return ' '.join(atis.get('text_atis', []))
+
+
+class AtisDiff:
+    """
+    ATIS差异引擎
+    按呼号记录上一次的频率和原始文本，只在新增、删除或原始文本变化时产生事件
+    """
+
+    def __init__(self):
+        self.known = {}  # callsign -> (frequency, raw_text)
+
+    def update(self, atis_list):
+        """比较新的ATIS列表，返回事件列表"""
+        current = {}
+        for atis in atis_list:
+            callsign = atis.get('callsign')
+            if callsign:
+                current[callsign] = atis
+
+        events = []
+        for callsign in list(self.known.keys()):
+            if callsign not in current:
+                del self.known[callsign]
+                events.append(AtisEvent(ATIS_REMOVED, callsign, None))
+
+        for callsign, atis in current.items():
+            state = (atis.get('frequency', '0'), atis_raw_text(atis))
+            previous = self.known.get(callsign)
+            self.known[callsign] = state
+            if previous is None:
+                events.append(AtisEvent(ATIS_ADDED, callsign, atis))
+            elif previous[0] != state[0]:
+                # 频率变化意味着换频道，按删除后重新添加处理
+                events.append(AtisEvent(ATIS_REMOVED, callsign, None))
+                events.append(AtisEvent(ATIS_ADDED, callsign, atis))
+            elif previous[1] != state[1]:
+                events.append(AtisEvent(ATIS_CHANGED, callsign, atis))
+        return events
+
+
+class FeedWatcher:
+    """
+    异步ATIS数据轮询器
+    复用同一个保持连接的会话，并通过ETag/If-Modified-Since避免重复下载未变化的数据
+    """
+
+    def __init__(self, url=request.DATA_URL, interval=30, timeout=10):
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.etag = None
+        self.last_modified = None
+        self.diff = AtisDiff()
+
+    async def fetch(self, session):
+        """获取数据，未变化(304)或出错时返回None"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        try:
+            async with session.get(self.url, headers=headers) as response:
+                if response.status == 304:
+                    return None
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+                return data
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error fetching data: {e}")
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON: {e}")
+        return None
+
+    async def run(self, handle_events, stopped):
+        """
+        轮询直到stopped()返回True
+        handle_events: 接收事件列表的回调，只在有变化时调用
+        """
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=1, keepalive_timeout=self.interval * 2)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            while not stopped():
+                data = await self.fetch(session)
+                if data and 'atis' in data:
+                    events = self.diff.update(data['atis'])
+                    if events:
+                        try:
+                            handle_events(events)
+                        except Exception as e:
+                            print(f"处理ATIS事件时出错: {e}")
+
+                # 等待下一次更新
+                for _ in range(self.interval):
+                    if stopped():
+                        break
+                    await asyncio.sleep(1)
@@ -1,214 +1,168 @@
-import request
-import process
-import pymumble_py3 as pymumble
+import os
+import sys
+# 与客户端共用的模块在仓库根目录的common包中
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import feed
+import cache
+import synthesis
+import pool
+from common import pacer, pcm, process
 import threading
-import numpy as np
 import time
-import os
-import wave
-import subprocess
-import io
 import asyncio
-import edge_tts
 import re
 
-class ATISBroadcaster(threading.Thread):
-    def __init__(self, atis_id, frequency, atis_text):
-        super().__init__()
+SERVER_HOST = "118.153.226.153"
+ATIS_PASSWORD = "p@ssw0rd"
+
+class ATISBroadcaster:
+    """
+    单个ATIS频道的播报内容，由连接池中的连接负责实际播报
+    文本设置后立即在合成服务中准备音频，音频就绪前连接池不会分配连接，播报时只从缓存取PCM
+    """
+
+    def __init__(self, atis_id, frequency, atis_text, synthesizer):
+        self.atis_id = atis_id
+        self.synthesizer = synthesizer
         freq_value = int(round(float(frequency) * 1000))
         channel_name = f"FREQ_{str(freq_value).zfill(6)}"
         self.channel_name = channel_name
-        self.user = f"900_atis{str(freq_value).zfill(6)}"
-        self.password = "p@ssw0rd"
         self.running = False
-        self.mumble = None
+        self._pending = {}  # 文本 -> 正在准备音频的Future
         
+        self.set_text(atis_text)
+
+        self.silence_duration = 1.0
+        self.pacer = pacer.FramePacer(pcm.FRAME_DURATION)
+
+    def set_text(self, atis_text):
+        """设置原始ATIS文本并生成播报用的处理后文本"""
         # 处理ATIS文本
         print (f"原始ATIS文本: {atis_text}")
+        self.raw_text = atis_text
         if '|' in atis_text:
-            self.english_text, self.chinese_text = [part.strip() for part in atis_text.split('|')]
-            self.english_text = process.process_single_atis_text(self.english_text, is_chinese=False)
-            self.chinese_text = process.process_single_atis_text(self.chinese_text, is_chinese=True)
+            english_text, chinese_text = [part.strip() for part in atis_text.split('|')]
+            self.english_text = process.process_single_atis_text(english_text, is_chinese=False)
+            self.chinese_text = process.process_single_atis_text(chinese_text, is_chinese=True)
         else:
             self.english_text = process.process_single_atis_text(atis_text.strip(), is_chinese=False)
             self.chinese_text = None
         print (f"处理后的ATIS文本: {self.english_text} ;; {self.chinese_text}")
+        self.prepare()
 
-
-        self.silence_duration = 1.0
-        self.last_sound_time = time.time()
-        self.chunk_size = 2000  # 20ms @ 48000Hz
-        self.loop = asyncio.new_event_loop()
-
-    def connect_to_server(self):
-        try:
-            # 如果频道是 FREQ_199998，跳过创建
-            if self.channel_name == "FREQ_199998":
-                print("跳过创建频道 FREQ_199998")
+    @staticmethod
+    def voice_for(text):
+        # 使用正则表达式检查是否包含中文字符
+        has_chinese = bool(re.search(r'[\u4e00-\u9fff]', text))
+        return "zh-CN-YunxiNeural" if has_chinese else "en-US-ChristopherNeural"
+
+    def prepare(self):
+        """在合成服务中准备当前文本的音频，不阻塞调用方"""
+        texts = [text for text in (self.chinese_text, self.english_text) if text]
+        self._pending = {text: self.synthesizer.prefetch(text, self.voice_for(text)) for text in texts}
+
+    def ready(self):
+        """本轮要播报的音频是否都已合成；连接池领取前调用，不阻塞"""
+        pending = self._pending
+        for text, future in list(pending.items()):
+            if not future.done():
                 return False
-                
-            self.mumble = pymumble.Mumble("118.153.226.153", self.user, password=self.password, reconnect=True)
-            self.mumble.set_receive_sound(True)
-            self.mumble.start()
-            time.sleep(1)  # 等待连接建立
-            
-            try:
-                channel = self.mumble.channels.find_by_name(self.channel_name)
-            except pymumble.errors.UnknownChannelError:
-                self.mumble.channels.new_channel(0, self.channel_name, temporary=True)
-                time.sleep(0.1)
-                channel = self.mumble.channels.find_by_name(self.channel_name)
-            
-            if channel:
-                self.mumble.users.myself.move_in(channel["channel_id"])
-                return True
-        except Exception as e:
-            print(f"连接错误: {e}")
+            if future.exception() is not None:
+                print(f"{self.channel_name} 音频合成失败，重新提交: {future.exception()}")
+                pending[text] = self.synthesizer.prefetch(text, self.voice_for(text))
+                return False
+            # 音频已在缓存中，不在这里保留一份
+            pending.pop(text, None)
+        return True
+
+    def check_channel_silence(self, connection):
+        """
+        检查本频道是否已持续静音，只查询连接上的活动监测器，不读取其他用户的音频队列；
+        连接进入本频道不满silence_duration秒时没有足够的记录，视为不安静
+        """
+        if connection.listened_for() < self.silence_duration:
             return False
-
-    def check_channel_silence(self):
-        """检查频道是否处于静音状态"""
-        current_time = time.time()
-        for user in self.mumble.users.values():
-            if user["name"] != self.mumble.users.myself["name"]:
-                sound = user.sound
-                if sound and sound.is_sound():
-                    self.last_sound_time = current_time
-                    return False
-        return (current_time - self.last_sound_time) >= self.silence_duration
-
-    async def _text_to_audio_edge(self, text, voice="en-US-ChristopherNeural"):
-        """使用edge-tts将文本转换为音频"""
-        # 打印转换的文本内容
-        # print (f"正在转换ATIS: {text.strip()}")
-        communicate = edge_tts.Communicate(text, voice)
-        temp_file = "temp_edge.mp3"
-        try:
-            await communicate.save(temp_file)
-            
-            # 使用ffmpeg将MP3转换为WAV格式
-            subprocess.run([
-                'ffmpeg', '-y',
-                '-i', temp_file,
-                '-ar', '48000',
-                '-ac', '1',
-                '-acodec', 'pcm_s16le',
-                'temp_processed.wav'
-            ], capture_output=True)
-            
-            with wave.open('temp_processed.wav', 'rb') as wf:
-                audio_data = wf.readframes(wf.getnframes())
-            
-            return audio_data
-        finally:
-            # 清理临时文件
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-            if os.path.exists('temp_processed.wav'):
-                os.remove('temp_processed.wav')
+        channel_id = connection.mumble.users.myself.get("channel_id", 0)
+        return connection.activity.is_silent(channel_id, self.silence_duration)
 
     def text_to_audio(self, text):
-        """将文本转换为音频数据"""
-        print (f"正在转换ATIS: {text}")
-        
-        # 使用正则表达式检查是否包含中文字符
-        has_chinese = bool(re.search(r'[\u4e00-\u9fff]', text))
-        
-        if has_chinese:  # 处理含中文的情况
-
-            audio_data = bytearray()
-            
-
-            # 转换中文部分
-
-            chinese_audio = self.loop.run_until_complete(
-                self._text_to_audio_edge(text, "zh-CN-YunxiNeural"))
-            audio_data.extend(chinese_audio)
-            
-            return bytes(audio_data)
-        else:
-            # 处理纯英文
-            return self.loop.run_until_complete(
-                self._text_to_audio_edge(text, "en-US-ChristopherNeural"))
-
-    def broadcast_audio(self, audio_data):
+        """
+        从缓存取得已合成的音频，不在占用连接时等待合成；
+        已被缓存淘汰时重新提交合成并返回None，音频就绪后下一轮再播报
+        """
+        audio = self.synthesizer.lookup(text, self.voice_for(text))
+        if audio is None:
+            self._pending[text] = self.synthesizer.prefetch(text, self.voice_for(text))
+        return audio
+
+    def broadcast_audio(self, connection, audio_data):
         """广播音频数据"""
         if not audio_data:
             return
 
-        position = 0
-        total_size = len(audio_data)
+        buffer = pcm.PcmBuffer(audio_data)
+        index = 0
+        self.pacer.reset()
 
-        while position < total_size and self.running:
-            if self.check_channel_silence():
-                chunk_size = min(self.chunk_size, total_size - position)
-                chunk = audio_data[position:position + chunk_size]
-                if len(chunk) < chunk_size:
-                    chunk += b'\x00' * (chunk_size - len(chunk))
-                
-                self.mumble.sound_output.add_sound(chunk)
-                position += chunk_size
-                time.sleep(0.02)
+        while index < len(buffer) and self.running:
+            if self.check_channel_silence(connection):
+                self.pacer.wait()
+                # opuslib只接受bytes，在交给编码器时才复制这一帧
+                connection.mumble.sound_output.add_sound(bytes(buffer.frame(index)))
+                index += 1
             else:
                 time.sleep(0.5)
+                self.pacer.reset()
 
-    def run(self):
-        """线程主函数"""
-        self.running = True
-        if not self.connect_to_server():
-            print(f"ATIS {self.user} 连接失败")
-            return
-
-        print(f"ATIS {self.user} 开始广播")
-        self._broadcast_loop()
-
-    def _broadcast_loop(self):
-        """广播循环函数"""
-        print("开始ATIS广播循环")
-        while self.running:
-            try:
-                if self.check_channel_silence():
-                    # 如果有中文ATIS，先播放中文
-                    if self.chinese_text:
-                        print("\n开始播放中文ATIS...")
-                        chinese_audio = self.text_to_audio(self.chinese_text)
-                        if chinese_audio:
-                            self.broadcast_audio(chinese_audio)
-
-                        if not self.running:
-                            break
-
-                        print("中文播放完成，等待检查频道状态...")
-
-                    # 播放英文ATIS
-                    if self.check_channel_silence() and self.running:
-                        print("\n开始播放英文ATIS...")
-                        english_audio = self.text_to_audio(self.english_text)
-                        if english_audio:
-                            self.broadcast_audio(english_audio)
-
-                    print("本轮播放完成，等待下一轮...")
-                    # time.sleep(30)  # 两轮播放之间的间隔
-                else:
-                    print("检测到频道有其他音频，等待...")
-                    time.sleep(5)  # 检测到其他音频时的等待时间
-
-            except Exception as e:
-                print(f"ATIS播放循环错误: {str(e)}")
-                time.sleep(5)  # 发生错误时的等待时间
-
-            if not self.running:
-                break
+    def broadcast_once(self, connection):
+        """
+        通过给定的连接播报一轮ATIS
+        返回距下次播报前需要等待的秒数
+        """
+        try:
+            # 刚移动到本频道时先收听silence_duration秒，确认没有人正在说话
+            remaining = self.silence_duration - connection.listened_for()
+            if remaining > 0:
+                time.sleep(remaining)
+            if not self.check_channel_silence(connection):
+                print(f"{self.channel_name} 检测到频道有其他音频，等待...")
+                return 5  # 检测到其他音频时的等待时间
+
+            # 如果有中文ATIS，先播放中文
+            if self.chinese_text:
+                print(f"\n{self.channel_name} 开始播放中文ATIS...")
+                chinese_audio = self.text_to_audio(self.chinese_text)
+                if chinese_audio:
+                    self.broadcast_audio(connection, chinese_audio)
+
+                if not self.running:
+                    return 0
+
+                print("中文播放完成，等待检查频道状态...")
+
+            # 播放英文ATIS
+            if self.check_channel_silence(connection) and self.running:
+                print(f"\n{self.channel_name} 开始播放英文ATIS...")
+                english_audio = self.text_to_audio(self.english_text)
+                if english_audio:
+                    self.broadcast_audio(connection, english_audio)
+
+            print(f"本轮播放完成，等待下一轮... 节拍统计: {self.pacer.stats()}")
+            return 0
+        except Exception as e:
+            print(f"ATIS播放循环错误: {str(e)}")
+            return 5  # 发生错误时的等待时间
 
     def stop(self):
         """停止广播"""
         self.running = False
-        if self.mumble:
-            self.mumble.stop()
 
 class ATISManager:
-    def __init__(self):
+    def __init__(self, max_synthesis=4, max_connections=None):
         self.broadcasters = {}
+        self.synthesizer = synthesis.SynthesisService(cache.AudioCache(), max_concurrency=max_synthesis)
+        # 连接数随有听众的ATIS数量增长，max_connections只作为可选的上限
+        self.pool = pool.ConnectionPool(SERVER_HOST, ATIS_PASSWORD, max_size=max_connections)
         self.update_interval = 30
         self._stop_flag = False
         self.update_thread = None
@@ -216,6 +170,8 @@ class ATISManager:
     def start(self):
         """启动ATIS管理器"""
         self._stop_flag = False
+        self.synthesizer.start()
+        self.pool.start()
         self.update_thread = threading.Thread(target=self._update_loop)
         self.update_thread.start()
 
@@ -224,63 +180,46 @@ class ATISManager:
         self._stop_flag = True
         if self.update_thread:
             self.update_thread.join()
-        for broadcaster in self.broadcasters.values():
-            broadcaster.stop()
-            broadcaster.join()
+        self.pool.stop()
         self.broadcasters.clear()
+        self.synthesizer.stop()
 
     def _update_loop(self):
         """更新ATIS信息的循环"""
-        while not self._stop_flag:
+        watcher = feed.FeedWatcher(interval=self.update_interval)
+        asyncio.run(watcher.run(self._handle_events, lambda: self._stop_flag))
+
+    def _handle_events(self, events):
+        """根据差异事件启动、停止或更新广播器"""
+        for event in events:
             try:
-                data = request.get_airwaysn_data()
-                if data and 'atis' in data:
-                    current_atis = {atis['callsign']: atis for atis in data['atis']}
-                    
+                if event.kind == feed.ATIS_REMOVED:
                     # 停止不再活跃的ATIS
-                    for callsign in list(self.broadcasters.keys()):
-                        if callsign not in current_atis:
-                            self.broadcasters[callsign].stop()
-                            self.broadcasters[callsign].join()
-                            del self.broadcasters[callsign]
-                    
-                    # 更新或启动新的ATIS
-                    for callsign, atis in current_atis.items():
-                        # 检查是否为199.998频率
-                        if abs(float(atis.get('frequency', '0')) - 199.998) < 0.001:
-                            print(f"跳过频率199.998的ATIS: {callsign}")
-                            continue
-                            
-                        text = ' '.join(atis.get('text_atis', []))
-                        if callsign not in self.broadcasters:
-                            # 新的ATIS
-                            broadcaster = ATISBroadcaster(
-                                atis_id=callsign,
-                                frequency=atis.get('frequency', '0'),
-                                atis_text=text
-                            )
-                            broadcaster.start()
-                            self.broadcasters[callsign] = broadcaster
-                        else:
-                            # 检查并更新现有ATIS的文本
-                            current_broadcaster = self.broadcasters[callsign]
-                            if text != current_broadcaster.english_text:  # 如果文本有变化
-                                print(f"更新 {callsign} 的ATIS文本")
-                                if '|' in text:
-                                    english, chinese = [part.strip() for part in text.split('|')]
-                                    current_broadcaster.english_text = process.process_single_atis_text(english, is_chinese=False)
-                                    current_broadcaster.chinese_text = process.process_single_atis_text(chinese, is_chinese=True)
-                                else:
-                                    current_broadcaster.english_text = process.process_single_atis_text(text.strip(), is_chinese=False)
-                                    current_broadcaster.chinese_text = None
+                    broadcaster = self.broadcasters.pop(event.callsign, None)
+                    if broadcaster:
+                        self.pool.remove(broadcaster)
+                elif event.kind == feed.ATIS_ADDED:
+                    # 检查是否为199.998频率
+                    if abs(float(event.atis.get('frequency', '0')) - 199.998) < 0.001:
+                        print(f"跳过频率199.998的ATIS: {event.callsign}")
+                        continue
+                    # 新的ATIS
+                    broadcaster = ATISBroadcaster(
+                        atis_id=event.callsign,
+                        frequency=event.atis.get('frequency', '0'),
+                        atis_text=feed.atis_raw_text(event.atis),
+                        synthesizer=self.synthesizer
+                    )
+                    self.pool.add(broadcaster)
+                    self.broadcasters[event.callsign] = broadcaster
+                elif event.kind == feed.ATIS_CHANGED:
+                    # 原始文本有变化时才重新处理
+                    broadcaster = self.broadcasters.get(event.callsign)
+                    if broadcaster:
+                        print(f"更新 {event.callsign} 的ATIS文本")
+                        broadcaster.set_text(feed.atis_raw_text(event.atis))
             except Exception as e:
                 print(f"更新ATIS信息时出错: {e}")
-            
-            # 等待下一次更新
-            for _ in range(self.update_interval):
-                if self._stop_flag:
-                    break
-                time.sleep(1)
 
 if __name__ == "__main__":
     manager = ATISManager()
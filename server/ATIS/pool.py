@@ -0,0 +1,282 @@
+import threading
+import time
+
+import pymumble_py3 as pymumble
+
+from common import activity
+
+
+class PooledConnection(threading.Thread):
+    """
+    连接池中的一个Mumble连接
+    工作线程从连接池领取等待播报的ATIS，移动到对应频道播报一轮后归还
+    """
+
+    def __init__(self, pool, index):
+        super().__init__(name=f"ATISConnection-{index}", daemon=True)
+        self.pool = pool
+        self.index = index
+        # 用户名的6位数字不与任何真实频率冲突
+        self.user = f"{pool.base_cid}_atis{str(200000 + index).zfill(6)}"
+        self.mumble = None
+        self.running = False
+        self.current_channel = None
+        self.joined_at = time.monotonic()  # 进入当前频道的时间，之前没有这个频道的活动记录
+        self._stop_event = threading.Event()
+        # 接收到的音频只用于判断频道是否有人说话
+        self.activity = activity.ChannelActivityMonitor()
+
+    def connect(self):
+        self.mumble = pymumble.Mumble(self.pool.host, self.user, password=self.pool.password, reconnect=True)
+        self.mumble.set_receive_sound(True)
+        self.mumble.callbacks.set_callback(pymumble.constants.PYMUMBLE_CLBK_SOUNDRECEIVED, self.activity.on_sound)
+        self.mumble.start()
+        self.mumble.is_ready()  # 等待连接建立或失败
+        if self.mumble.connected != pymumble.constants.PYMUMBLE_CONN_STATE_CONNECTED:
+            raise ConnectionError("连接被拒绝或服务器不可达")
+        self.joined_at = time.monotonic()
+
+    def connect_with_retry(self):
+        """连接失败时按指数退避重试，直到连接成功（返回True）或连接被停止（返回False）"""
+        delay = self.pool.retry_delay
+        while self.running:
+            try:
+                self.connect()
+                return True
+            except Exception as e:
+                print(f"ATIS连接 {self.user} 连接错误: {e}，{delay:g}秒后重试")
+                if self.mumble:
+                    self.mumble.stop()
+                    self.mumble = None
+            if self._stop_event.wait(delay):
+                break
+            delay = min(delay * 2, self.pool.max_retry_delay)
+        return False
+
+    def listened_for(self):
+        """在当前频道已经收听了多少秒"""
+        return time.monotonic() - self.joined_at
+
+    def move_to(self, channel_name):
+        """移动到指定频道，频道不存在时创建临时频道"""
+        try:
+            channel = self.mumble.channels.find_by_name(channel_name)
+        except pymumble.errors.UnknownChannelError:
+            self.mumble.channels.new_channel(0, channel_name, temporary=True)
+            time.sleep(0.1)
+            channel = self.mumble.channels.find_by_name(channel_name)
+
+        channel_id = channel["channel_id"]
+        if self.mumble.users.myself.get("channel_id", 0) != channel_id:
+            self.mumble.users.myself.move_in(channel_id)
+            # 等待服务器确认移动完成
+            deadline = time.time() + 1.0
+            while self.mumble.users.myself.get("channel_id", 0) != channel_id and time.time() < deadline:
+                time.sleep(0.02)
+            # 活动监测器只收到所在频道的语音，刚进入的频道还没有记录，要重新收听一段时间
+            self.joined_at = time.monotonic()
+        self.current_channel = channel_name
+
+    def run(self):
+        self.running = True
+        if not self.connect_with_retry():
+            return
+
+        print(f"ATIS连接 {self.user} 已就绪")
+        idle_since = time.monotonic()
+        while self.running:
+            station = self.pool.acquire(timeout=1.0, connection=self)
+            if station is None:
+                # 空闲太久且连接数多于最小值时退出，需求增加时连接池会重新创建
+                if time.monotonic() - idle_since >= self.pool.idle_timeout and self.pool.retire(self):
+                    print(f"ATIS连接 {self.user} 空闲，已释放")
+                    self.stop()
+                continue
+            delay = 5
+            try:
+                self.move_to(station.channel_name)
+                delay = station.broadcast_once(self)
+            except Exception as e:
+                print(f"ATIS {station.channel_name} 播报错误: {e}")
+            finally:
+                self.pool.release(station, delay)
+                idle_since = time.monotonic()
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+        if self.mumble:
+            self.mumble.stop()
+
+
+class ConnectionPool:
+    """
+    ATIS的Mumble连接池
+    连接数量随有听众的ATIS数量伸缩，而不是随全部ATIS线性增长，没有听众的频道不占用连接；
+    后台每秒检查一次，到期、音频已合成、有听众的ATIS多于空闲和正在建立的连接时补足差额，
+    每个有听众的ATIS都能连续播报，不用排队等其他频道播完；max_size为连接数上限（None不限），
+    空闲超过idle_timeout秒的连接退出，最少保留min_size个；
+    连接失败时从retry_delay秒开始按指数退避重试，最长max_retry_delay秒
+    """
+
+    def __init__(self, host, password, max_size=None, min_size=1, base_cid="900",
+                 idle_timeout=60.0, retry_delay=1.0, max_retry_delay=60.0):
+        self.host = host
+        self.password = password
+        self.max_size = max_size
+        self.min_size = min_size if max_size is None else min(min_size, max_size)
+        self.base_cid = base_cid
+        self.idle_timeout = idle_timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.connections = []
+        self._stations = []  # 等待播报的ATIS，按轮转顺序排列
+        self._due = {}  # station -> 下次可以播报的时间
+        self._busy = 0  # 正在播报（已领取ATIS还没归还）的连接数
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._monitor = None
+
+    def start(self):
+        self._stopping.clear()
+        with self._cond:
+            for _ in range(self.min_size):
+                self._spawn()
+        # 连接都在播报时没有人领取新到期或新有听众的ATIS，由监视线程负责扩容
+        self._monitor = threading.Thread(target=self._watch, name="ATISPoolMonitor", daemon=True)
+        self._monitor.start()
+
+    def _watch(self):
+        while not self._stopping.wait(1.0):
+            with self._cond:
+                self._grow()
+
+    def _spawn(self):
+        """新建一个连接（调用方持有锁），用户名使用最小的空闲编号"""
+        used = {connection.index for connection in self.connections}
+        index = next(index for index in range(len(used) + 1) if index not in used)
+        connection = PooledConnection(self, index)
+        self.connections.append(connection)
+        connection.start()
+
+    def _grow(self):
+        """
+        等待播报的ATIS多于没有在播报的连接时补足差额（调用方持有锁）；
+        正在建立、等待领取和刚归还ATIS的连接都算作可用，不会重复扩容
+        """
+        room = float("inf") if self.max_size is None else self.max_size - len(self.connections)
+        if room <= 0:
+            return
+        now = time.time()
+        waiting = sum(1 for station in self._stations if self._is_waiting(station, now))
+        missing = int(min(waiting - (len(self.connections) - self._busy), room))
+        if missing > 0:
+            print(f"ATIS连接池扩容: {len(self.connections)} -> {len(self.connections) + missing}")
+            for _ in range(missing):
+                self._spawn()
+
+    def _is_waiting(self, station, now):
+        """ATIS已到期、音频已准备好并且频道中有听众（调用方持有锁）"""
+        return self._due[station] <= now and station.ready() and self.has_listeners(station.channel_name)
+
+    def retire(self, connection):
+        """空闲的连接请求退出，连接数多于min_size时从池中移除并返回True"""
+        with self._cond:
+            if len(self.connections) <= self.min_size or connection not in self.connections:
+                return False
+            self.connections.remove(connection)
+            return True
+
+    def stop(self):
+        self._stopping.set()
+        if self._monitor:
+            self._monitor.join(timeout=2)
+            self._monitor = None
+        with self._cond:
+            for station in self._stations:
+                station.stop()
+            self._stations.clear()
+            self._due.clear()
+            self._cond.notify_all()
+            connections = list(self.connections)
+            self.connections.clear()
+        for connection in connections:
+            connection.stop()
+        for connection in connections:
+            connection.join(timeout=5)
+
+    def add(self, station):
+        """注册一个ATIS广播器"""
+        with self._cond:
+            station.running = True
+            self._stations.append(station)
+            self._due[station] = 0
+            self._cond.notify()
+            self._grow()
+
+    def remove(self, station):
+        """注销ATIS广播器，正在播报的会尽快停止"""
+        with self._cond:
+            station.stop()
+            if station in self._stations:
+                self._stations.remove(station)
+            self._due.pop(station, None)
+
+    def acquire(self, timeout=None, connection=None):
+        """
+        领取下一个到期、音频已准备好且有听众的ATIS，没有时等待至超时；
+        优先领取connection所在频道的ATIS，连续播报时不用换频道和重新收听
+        """
+        deadline = time.time() + (timeout or 0)
+        with self._cond:
+            station = self._next_station(deadline, connection.current_channel if connection else None)
+            if station is not None:
+                self._busy += 1
+                # 本连接开始播报，其他ATIS也在等待而没有空闲连接时扩容
+                self._grow()
+            return station
+
+    def _next_station(self, deadline, channel_name=None):
+        """调用方持有锁"""
+        while True:
+            now = time.time()
+            found = None
+            for index, station in enumerate(self._stations):
+                if self._is_waiting(station, now):
+                    if found is None:
+                        found = index
+                    if channel_name is None or station.channel_name == channel_name:
+                        found = index
+                        break
+            if found is not None:
+                # 移出轮转队列，播报结束后排到队尾
+                return self._stations.pop(found)
+            remaining = deadline - now
+            if remaining <= 0:
+                return None
+            self._cond.wait(min(remaining, 0.5))
+
+    def release(self, station, delay=0):
+        """归还acquire()领取的ATIS，delay秒后可再次播报"""
+        with self._cond:
+            self._busy -= 1
+            if station.running and station in self._due:
+                self._stations.append(station)
+                self._due[station] = time.time() + delay
+                self._cond.notify()
+
+    def has_listeners(self, channel_name):
+        """频道中是否有ATIS以外的用户"""
+        for connection in self.connections:
+            mumble = connection.mumble
+            if not mumble or mumble.connected != pymumble.constants.PYMUMBLE_CONN_STATE_CONNECTED:
+                continue
+            try:
+                channel = mumble.channels.find_by_name(channel_name)
+            except pymumble.errors.UnknownChannelError:
+                return False
+            for user in list(mumble.users.values()):
+                if user.get("channel_id", 0) == channel["channel_id"] and "_atis" not in user["name"]:
+                    return True
+            return False
+        return False
@@ -3,9 +3,10 @@ import json
 from tabulate import tabulate
 
 atisdata = None
+DATA_URL = "https://data.airwaysn.org/v1/data.json"
 
 def get_airwaysn_data():
-    url = "https://data.airwaysn.org/v1/data.json"
+    url = DATA_URL
     try:
         response = requests.get(url)
         response.raise_for_status()
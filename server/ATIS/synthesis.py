@@ -0,0 +1,172 @@
+import asyncio
+import concurrent.futures
+import re
+import threading
+
+import edge_tts
+import numpy as np
+
+import decoder
+
+
+# 分段边界：句读标点处，以及这些关键词之前。每段单独合成和缓存，ATIS更新时只有变化的段落需要重新合成
+segment_keywords = [
+    "INFORMATION", "INFO", "runway", "wind", "QNH", "altimeter", "VIS", "VISIBILITY", "CAVOK",
+    "TEMP", "TEMPERATURE", "DEWPOINT", "EXPECT", "ADVISE", "TREND", "NOSIG", "TEMPO", "BECMG",
+    "情报通播", "跑道", "风向", "修正海压", "高度表", "能见度", "温度", "露点", "预计", "趋势",
+]
+_segment_pattern = re.compile(
+    r"[,.;，。；]+\s*"
+    r"|\s+(?=(?:" + "|".join(word for word in segment_keywords if word.isascii()) + r")\b)"
+    r"|\s*(?=(?:" + "|".join(word for word in segment_keywords if not word.isascii()) + r"))",
+    re.IGNORECASE,
+)
+
+
+def split_segments(text):
+    """把处理后的ATIS文本切分为短语段落；对单个段落再次切分结果不变"""
+    return [part.strip() for part in _segment_pattern.split(text) if part.strip()]
+
+
+def join_segments(parts, sample_rate, crossfade=0.01, keep_silence=0.08, threshold=200):
+    """
+    拼接各段落的PCM：先把每段首尾的静音裁到keep_silence秒，再在接缝处做crossfade秒的线性交叉淡化
+    """
+    arrays = []
+    for pcm in parts:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        loud = np.flatnonzero(np.abs(samples.astype(np.int32)) > threshold)
+        if len(loud) == 0:
+            continue
+        keep = int(keep_silence * sample_rate)
+        arrays.append(samples[max(0, loud[0] - keep):loud[-1] + 1 + keep])
+    if not arrays:
+        return b""
+
+    overlap = int(crossfade * sample_rate)
+    fade_in = np.linspace(0.0, 1.0, overlap, endpoint=False, dtype=np.float32)
+    result = arrays[0].astype(np.float32)
+    for samples in arrays[1:]:
+        n = min(overlap, len(result), len(samples))
+        head = samples.astype(np.float32)
+        head[:n] = result[-n:] * (1.0 - fade_in[:n]) + head[:n] * fade_in[:n]
+        result = np.concatenate([result[:len(result) - n], head])
+    return np.clip(np.rint(result), -32768, 32767).astype(np.int16).tobytes()
+
+
+class SynthesisService:
+    """
+    共享的TTS合成服务
+    所有广播器线程向同一个asyncio事件循环提交文本并等待PCM结果，
+    同时进行的合成数量由信号量限制，相同的请求会被合并为一次合成；
+    文本按短语分段，每段单独合成和缓存后拼接，ATIS更新时只重新合成变化的段落
+    """
+
+    def __init__(self, audio_cache, max_concurrency=4, sample_rate=48000, timeout=60):
+        self.cache = audio_cache
+        self.max_concurrency = max_concurrency
+        self.sample_rate = sample_rate
+        self.timeout = timeout
+        self.loop = None
+        self.thread = None
+        self._semaphore = None
+        self._pending = {}  # 缓存键 -> 正在进行的合成任务
+        self._ready = threading.Event()
+        self.segments_reused = 0  # 从缓存取得的段落数
+        self.segments_synthesized = 0  # 重新合成的段落数
+
+    def start(self):
+        """启动合成服务的事件循环线程"""
+        if self.thread and self.thread.is_alive():
+            return
+        self._ready.clear()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="SynthesisService", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        """停止事件循环并等待线程退出"""
+        if self.loop and self.thread and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+        self.thread = None
+
+    def submit(self, text, voice):
+        """提交合成请求，返回concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self._request(text, voice), self.loop)
+
+    def lookup(self, text, voice):
+        """只查缓存，未命中时返回None，不触发合成"""
+        return self.cache.get(text, voice, self.sample_rate)
+
+    def prefetch(self, text, voice):
+        """不阻塞地准备音频，返回Future：缓存命中时已完成（结果为None，音频留在缓存中），否则提交合成"""
+        if self.lookup(text, voice) is not None:
+            future = concurrent.futures.Future()
+            future.set_result(None)
+            return future
+        return self.submit(text, voice)
+
+    def synthesize(self, text, voice):
+        """在调用线程中阻塞等待合成结果，缓存命中时直接返回"""
+        pcm = self.cache.get(text, voice, self.sample_rate)
+        if pcm is not None:
+            return pcm
+        return self.submit(text, voice).result(self.timeout)
+
+    async def _request(self, text, voice):
+        key = self.cache.make_key(text, voice, self.sample_rate)
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._build(text, voice))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        # shield 防止某个等待方取消时影响其他等待同一结果的广播器
+        return await asyncio.shield(task)
+
+    async def _build(self, text, voice):
+        """整段文本：分段取得PCM后拼接，结果再按整段缓存"""
+        segments = split_segments(text)
+        if len(segments) <= 1:
+            return await self._synthesize(text, voice)
+
+        parts = await asyncio.gather(*(self._segment(segment, voice) for segment in segments))
+        pcm = join_segments([part for part, _ in parts], self.sample_rate)
+        print(f"分段合成完成: 共 {len(segments)} 段，重新合成 {sum(1 for _, fresh in parts if fresh)} 段")
+        if pcm and all(part for part, _ in parts):
+            await self.loop.run_in_executor(None, self.cache.put, text, voice, self.sample_rate, pcm)
+        return pcm
+
+    async def _segment(self, text, voice):
+        """返回 (段落PCM, 是否重新合成)，缓存命中时不访问edge-tts"""
+        pcm = await self.loop.run_in_executor(None, self.cache.get, text, voice, self.sample_rate)
+        if pcm is not None:
+            self.segments_reused += 1
+            return pcm, False
+        self.segments_synthesized += 1
+        return await self._request(text, voice), True
+
+    async def _synthesize(self, text, voice):
+        async with self._semaphore:
+            print(f"正在转换ATIS: {text}")
+            # 每个请求使用独立的通信对象和解码器，互不干扰
+            communicate = edge_tts.Communicate(text, voice)
+            stream_decoder = decoder.StreamDecoder(self.sample_rate)
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    stream_decoder.feed(chunk["data"])
+            pcm = stream_decoder.finish()
+
+        if pcm:
+            await self.loop.run_in_executor(None, self.cache.put, text, voice, self.sample_rate, pcm)
+        return pcm
@@ -0,0 +1,203 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitBreaker:
+    """
+    上游熔断器
+    连续failure_threshold次失败（网络错误、5xx或响应慢于slow_threshold秒）后断开，
+    断开期间直接走后备逻辑；reset_timeout秒后放行一个试探请求，成功则恢复
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    PROBE = "probe"  # allow()放行半开状态下的试探请求时的返回值
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, slow_threshold=2.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_threshold = slow_threshold
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    def allow(self):
+        """
+        是否可以请求上游：拒绝时返回False，放行时返回True；
+        半开状态下同一时间只放行一个试探请求，返回PROBE，其结果需以probe=True记录
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return self.PROBE
+
+    def record(self, ok, elapsed, probe=False):
+        """记录一次上游请求的结果；ok为False表示请求失败，probe表示是否为半开状态下的试探请求"""
+        healthy = ok and elapsed < self.slow_threshold
+        with self._lock:
+            if probe:
+                self._probing = False
+            elif self.state == self.HALF_OPEN:
+                # 断开前发出、现在才返回的请求：半开状态只由试探请求的结果决定
+                return
+            if healthy:
+                self._failures = 0
+                if self.state != self.CLOSED:
+                    print("认证上游已恢复，熔断器关闭")
+                self.state = self.CLOSED
+                return
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    print(f"认证上游异常（连续{self._failures}次），熔断{self.reset_timeout}秒")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class _Call:
+    """一次正在进行的上游请求，同一(CID, 密码)的并发认证共享结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class AuthBackend:
+    """
+    认证上游客户端
+    - 复用keep-alive连接池（requests.Session），连接和读取都有超时，Ice派发线程不会无限等待
+    - 先查AuthCache；同一(CID, 密码)的并发请求合并成一次上游请求
+    - 上游失败或熔断时，stale_ttl秒内验证成功过的同一密码仍允许登录
+    verify()返回True/False
+    """
+
+    def __init__(self, url, cache, connect_timeout=2.0, read_timeout=3.0, pool_size=16,
+                 stale_ttl=6 * 3600.0, breaker=None):
+        self.url = url
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.stale_ttl = stale_ttl
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._inflight = {}  # digest -> _Call
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.merged = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self.rejected_open = 0
+
+    def request(self, cid, password, probe=False):
+        """
+        向上游认证接口验证，返回True（200）、False（4xx，明确拒绝）或None（请求失败、超时或5xx）
+        probe表示这是熔断器半开状态下的试探请求
+        """
+        data = {
+            "cid": str(cid),
+            "password": str(password),
+        }
+        print(f"登录请求: {data['cid']}")
+        start = time.monotonic()
+        try:
+            response = self.session.post(self.url, json=data, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"请求错误: {e}")
+            self.breaker.record(False, time.monotonic() - start, probe)
+            return None
+        elapsed = time.monotonic() - start
+        if response.status_code >= 500:
+            print(f"认证服务器错误: {response.status_code}")
+            self.breaker.record(False, elapsed, probe)
+            return None
+        self.breaker.record(True, elapsed, probe)
+        if response.status_code == 200:
+            print(f"登录成功: {response.status_code}, {response.text}")
+            return True
+        print(f"登录失败: {response.status_code}, {response.text}")
+        return False
+
+    def verify(self, cid, password):
+        """验证(CID, 密码)，可在多个线程中同时调用"""
+        cid = str(cid)
+        cached = self.cache.get(cid, password)
+        if cached is not None:
+            print(f"认证缓存命中: {cid} -> {'成功' if cached else '失败'}")
+            return cached
+
+        key = self.cache.digest(cid, password)
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._inflight[key] = call
+            else:
+                self.merged += 1
+
+        if not leader:
+            # 等待时间不超过一次上游请求的超时，等不到就按失败处理
+            if call.done.wait(sum(self.timeout) + 1.0):
+                return call.result
+            return self._fallback(cid, password)
+
+        try:
+            call.result = self._verify_upstream(cid, password)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def _verify_upstream(self, cid, password):
+        permit = self.breaker.allow()
+        if not permit:
+            self.rejected_open += 1
+            return self._fallback(cid, password)
+        self.requests += 1
+        result = self.request(cid, password, probe=permit == CircuitBreaker.PROBE)
+        if result is None:
+            self.failures += 1
+            return self._fallback(cid, password)
+        self.cache.put(cid, password, result)
+        return result
+
+    def _fallback(self, cid, password):
+        """上游不可用：只接受最近验证成功过的同一密码"""
+        if self.cache.get_stale(cid, password, self.stale_ttl):
+            self.fallbacks += 1
+            print(f"认证上游不可用，使用最近的验证结果: {cid}")
+            return True
+        return False
+
+    def stats(self):
+        result = self.cache.stats()
+        result.update({
+            "requests": self.requests,
+            "merged": self.merged,
+            "failures": self.failures,
+            "fallbacks": self.fallbacks,
+            "rejected_open": self.rejected_open,
+            "breaker": self.breaker.state,
+            "trips": self.breaker.trips,
+        })
+        return result
@@ -0,0 +1,124 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class AuthCache:
+    """
+    认证结果缓存，按CID保存一条记录：密码的加盐摘要、认证结果和验证时间
+    摘要使用进程启动时随机生成的盐，内存中不保存明文密码，重启后缓存自然失效；
+    成功结果缓存ttl秒，失败结果（上游明确拒绝）缓存negative_ttl秒，网络错误不缓存；
+    最近一次验证成功的摘要与最新结果分开保存，其他密码的失败结果不会覆盖它，
+    在被淘汰前上游不可用时可通过get_stale()作为后备；
+    条目数超过max_entries时淘汰最久未使用的
+    """
+
+    def __init__(self, ttl=600.0, negative_ttl=30.0, max_entries=4096):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._salt = os.urandom(16)
+        # cid -> (digest, ok, checked_at, verified_digest, verified_at)，末尾为最近使用；
+        # 前三项是最新一次上游结果，后两项是最近一次验证成功的密码摘要和时间（没有时为None, 0.0）
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def digest(self, cid, password):
+        """(CID, 密码)的加盐摘要，也可用作合并并发请求的键"""
+        return hashlib.blake2b(f"{cid}\0{password}".encode("utf-8"), key=self._salt, digest_size=32).digest()
+
+    def get(self, cid, password):
+        """返回缓存的认证结果（True/False），未命中或已过期时返回None"""
+        cid = str(cid)
+        digest = self.digest(cid, password)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cid)
+            if entry is None:
+                self.misses += 1
+                return None
+            cached_digest, ok, checked_at = entry[:3]
+            if checked_at + (self.ttl if ok else self.negative_ttl) <= now:
+                self.expired += 1
+                self.misses += 1
+                return None
+            if not hmac.compare_digest(cached_digest, digest):
+                # 密码和缓存的不同：可能是改了密码或输错，交给上游判断
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cid)
+            if ok:
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return ok
+
+    def put(self, cid, password, ok):
+        """记录上游的认证结果"""
+        cid = str(cid)
+        digest = self.digest(cid, password)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cid)
+            if ok:
+                verified = (digest, now)
+            elif entry is None or entry[3] == digest:
+                # 上游拒绝了之前验证成功的密码（已修改密码），不能再作为后备
+                verified = (None, 0.0)
+            else:
+                # 其他密码的失败不影响最近验证成功的密码，过了ttl之后也仍可作为后备
+                verified = entry[3:]
+            if not ok and entry is not None and entry[1] and entry[2] + self.ttl > now and entry[0] != digest:
+                # 输错的密码不覆盖仍然有效的成功记录，否则别人随便试一次就能让正确密码失去缓存
+                return
+            self._entries[cid] = (digest, bool(ok), now) + verified
+            self._entries.move_to_end(cid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_stale(self, cid, password, max_age):
+        """
+        上游不可用时的后备：max_age秒内验证成功过、且密码相同时返回True
+        不计入命中统计，调用方自行记录
+        """
+        cid = str(cid)
+        digest = self.digest(cid, password)
+        with self._lock:
+            entry = self._entries.get(cid)
+            if entry is None:
+                return False
+            verified_digest, verified_at = entry[3:]
+            return (verified_digest is not None and time.monotonic() - verified_at <= max_age
+                    and hmac.compare_digest(verified_digest, digest))
+
+    def invalidate(self, cid):
+        """删除某个CID的缓存记录"""
+        with self._lock:
+            self._entries.pop(str(cid), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """命中率等统计信息"""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,228 @@
+# 认证器压力测试：模拟服务器重启后大量客户端同时重连
+# 直接调用AuthenticatorI.authenticate，上游换成本地的假认证接口，不需要Murmur服务器和外网
+# 用法: python loadtest.py --users 300 --concurrency 64 --latency 0.2 --error-rate 0.05
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import login
+from authbackend import AuthBackend
+from authcache import AuthCache
+from username import parse_username
+
+
+def password_for(cid):
+    """假认证接口接受的密码"""
+    return f"pw{cid}"
+
+
+class FakeAuthServer:
+    """
+    本地假认证接口，行为与 https://airwaysn.org/api/v1/public/auth 相同：
+    密码正确返回200，错误返回400；可配置响应延迟（均值和抖动）和5xx错误率
+    """
+
+    def __init__(self, latency=0.1, jitter=0.05, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持keep-alive，和真实接口一致
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                delay, failed = owner._next()
+                time.sleep(delay)
+                if failed:
+                    status, text = 500, b'{"error":"internal"}'
+                elif body.get("password") == password_for(body.get("cid")):
+                    status, text = 200, b'{"ok":true}'
+                else:
+                    status, text = 400, b'{"ok":false}'
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(text)))
+                self.end_headers()
+                self.wfile.write(text)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 1024  # 默认backlog只有5，重连风暴时会直接拒绝连接
+            daemon_threads = True
+
+        self.httpd = Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/api/v1/public/auth"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _next(self):
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter))
+            return delay, self._random.random() < self.error_rate
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeServerProxy:
+    """代替Murmur.ServerPrx，只记录被踢出的session"""
+
+    def __init__(self):
+        self.kicks = []
+        self._lock = threading.Lock()
+
+    def kickUser(self, session, reason, context=None):
+        with self._lock:
+            self.kicks.append(session)
+
+
+class FakeUser:
+    """userConnected/userDisconnected收到的Murmur.User，只用到name、session和channel"""
+
+    def __init__(self, name, session, channel=0):
+        self.name = name
+        self.session = session
+        self.channel = channel
+
+
+def make_logins(users, atis_ratio, wrong_ratio, seed=0):
+    """生成(用户名, 密码)：普通CID和DDDD_atisDDDDDD格式的ATIS用户名，少部分密码错误"""
+    rng = random.Random(seed)
+    logins = []
+    for i in range(users):
+        cid = 1000 + i
+        if rng.random() < atis_ratio:
+            name = f"{cid}_atis{rng.randrange(118000, 137000, 25):06d}"
+        else:
+            name = str(cid)
+        password = password_for(cid)
+        if rng.random() < wrong_ratio:
+            password += "x"
+        logins.append((name, password))
+    return logins
+
+
+class _silenced:
+    """临时屏蔽认证过程中的print，避免输出本身成为瓶颈"""
+
+    def __enter__(self):
+        import builtins
+        self._print = builtins.print
+        builtins.print = lambda *args, **kwargs: None
+
+    def __exit__(self, *exc):
+        import builtins
+        builtins.print = self._print
+
+
+def run_round(auth, logins, concurrency):
+    """所有用户同时认证一次，返回(每次认证耗时, 成功数, 总耗时)"""
+    latencies = np.zeros(len(logins))
+    accepted = [False] * len(logins)
+    barrier = threading.Barrier(min(concurrency, len(logins)))
+
+    def attempt(index):
+        name, password = logins[index]
+        if index < barrier.parties:
+            barrier.wait()  # 第一批请求同时发出，模拟重连风暴
+        start = time.perf_counter()
+        user_id, _, _ = auth.authenticate(name, password, [], "", False)
+        latencies[index] = time.perf_counter() - start
+        accepted[index] = user_id >= 0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(attempt, range(len(logins))))
+    return latencies, sum(accepted), time.perf_counter() - start
+
+
+def run(users=200, concurrency=64, rounds=3, atis_ratio=0.2, wrong_ratio=0.02,
+        latency=0.1, jitter=0.05, error_rate=0.0, quiet=True):
+    """
+    第一轮是冷启动（缓存为空），之后每轮模拟所有人断线重连：
+    上一轮登录成功的用户仍登记为在线，重新认证时会触发重复登录的踢出
+    """
+    server = FakeAuthServer(latency, jitter, error_rate).start()
+    proxy = FakeServerProxy()
+    login.url = server.url
+    login.auth_cache = AuthCache()
+    login.auth_backend = AuthBackend(server.url, login.auth_cache)
+    auth = login.AuthenticatorI(None, None, proxy)
+    logins = make_logins(users, atis_ratio, wrong_ratio)
+
+    results = []
+    session = 0
+    try:
+        for number in range(rounds):
+            requests_before = server.requests
+            kicks_before = len(proxy.kicks)
+            if quiet:
+                with _silenced():
+                    latencies, accepted, elapsed = run_round(auth, logins, concurrency)
+            else:
+                latencies, accepted, elapsed = run_round(auth, logins, concurrency)
+            auth.online_users.wait_kicks(10.0)  # 踢出在后台执行，统计前等它们完成
+            results.append({
+                "round": number + 1,
+                "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "p99_ms": float(np.percentile(latencies, 99) * 1000),
+                "max_ms": float(latencies.max() * 1000),
+                "throughput": len(logins) / elapsed,
+                "accepted": accepted,
+                "upstream": server.requests - requests_before,
+                "kicks": len(proxy.kicks) - kicks_before,
+            })
+            # 本轮成功的连接登记为在线，下一轮重连时旧session还没断开
+            with _silenced():
+                for name, password in logins:
+                    if password == password_for(parse_username(name).cid):
+                        session += 1
+                        auth.userConnected(FakeUser(name, session))
+    finally:
+        auth.online_users.shutdown()
+        server.stop()
+    return results, login.auth_backend.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="认证器压力测试")
+    parser.add_argument("--users", type=int, default=200, help="用户数")
+    parser.add_argument("--concurrency", type=int, default=64, help="同时认证的线程数")
+    parser.add_argument("--rounds", type=int, default=3, help="重连轮数（第一轮为冷启动）")
+    parser.add_argument("--atis-ratio", type=float, default=0.2, help="ATIS用户名的比例")
+    parser.add_argument("--wrong-ratio", type=float, default=0.02, help="密码错误的比例")
+    parser.add_argument("--latency", type=float, default=0.1, help="假接口平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.05, help="假接口延迟标准差（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="假接口返回500的概率")
+    parser.add_argument("--verbose", action="store_true", help="显示认证日志")
+    args = parser.parse_args()
+
+    results, stats = run(args.users, args.concurrency, args.rounds, args.atis_ratio, args.wrong_ratio,
+                         args.latency, args.jitter, args.error_rate, quiet=not args.verbose)
+    print(f"{'轮次':>4} {'p50(ms)':>9} {'p99(ms)':>9} {'max(ms)':>9} {'吞吐(次/s)':>11} {'成功':>6} {'上游请求':>8} {'踢出':>6}")
+    for r in results:
+        print(f"{r['round']:>4} {r['p50_ms']:9.1f} {r['p99_ms']:9.1f} {r['max_ms']:9.1f} {r['throughput']:11.1f} "
+              f"{r['accepted']:>6} {r['upstream']:>8} {r['kicks']:>6}")
+    print(f"认证统计: {stats}")
+
+
+if __name__ == "__main__":
+    main()
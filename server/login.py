@@ -2,47 +2,44 @@
 # https://airwaysn.org/api/v1/public/auth
 # json:{ "cid":"1000", "password": "1234"}
 # 正确返回200，错误返回400
+import itertools
 import sys
 import Ice
 import Murmur
-import requests
-import json
 import traceback
-import re
+from authcache import AuthCache
+from authbackend import AuthBackend
+from sessions import SessionRegistry
+from username import ATIS, PILOT, parse_username
 
 class AuthenticatorI(Murmur.ServerAuthenticator):
     def __init__(self, server, adapter , serverprx=None):
         self.serverprx = serverprx
         self.server = server
         self.adapter = adapter
-        self.online_users = {}  # 存储在线用户的session
+        self.online_users = SessionRegistry(serverprx)  # 在线用户的session，多个Ice线程并发访问
+        self._auth_counter = itertools.count(1)  # next()是原子操作，并发认证时计数不会丢失
 
     def authenticate(self, name, pw, certificates, certhash, certstrong, current=None):
         try:
             print(f"认证用户: {name}")
-            # 检查是否是ATIS登录
-            atis_pattern = re.compile(r"^.*_atis\d{6}")
-            if atis_pattern.match(name):
+            if next(self._auth_counter) % STATS_INTERVAL == 0:
+                print(f"认证统计: {auth_backend.stats()}")
+                print(f"会话统计: {self.online_users.stats()}")
+            # 用户名只解析一次：机组CID、ATIS（DDDD_atisDDDDDD）或无效
+            username = parse_username(name)
+            if username.kind == ATIS:
                 print(f"匹配到ATIS登录: {name}")
-                if login_ATIS(name, pw):
-                    if name in self.online_users:
-                        old_session = self.online_users[name]
-                        try:
-                            self.serverprx.kickUser(old_session, "您的账号在其他位置登录")
-                        except Exception as e:
-                            print(f"踢出用户失败: {e}")
-                    # 提取atis后面的6位数字作为用户ID
-                    atis_id = name.split("_atis")[1]
-                    return (int(atis_id), name, [])
+                if login_ATIS(username, pw):
+                    self.online_users.evict(name)
+                    # atis后面的6位数字作为用户ID
+                    return (username.user_id, name, [])
+            elif username.kind == PILOT:
+                if login(username.cid, pw):
+                    self.online_users.evict(name)
+                    return (username.user_id, name, [])
             else:
-                if login(name, pw):
-                    if name in self.online_users:
-                        old_session = self.online_users[name]
-                        try:
-                            self.serverprx.kickUser(old_session, "您的账号在其他位置登录")
-                        except Exception as e:
-                            print(f"踢出用户失败: {e}")
-                    return (int(name), name, [])
+                print(f"用户名格式无效: {name[:32]!r}")
             return (-1, "", [])
         except Exception as e:
             print(f"认证异常: {e}")
@@ -59,12 +56,11 @@ class AuthenticatorI(Murmur.ServerAuthenticator):
         return str(id)
 
     def userConnected(self, user, current=None):
-        self.online_users[user.name] = user.session
+        self.online_users.add(user.session, user.name, user.channel)
         print(f"用户 {user.name} 已连接，session: {user.session}")
 
     def userDisconnected(self, user, current=None):
-        if user.name in self.online_users:
-            del self.online_users[user.name]
+        self.online_users.remove(user.session)
         print(f"用户 {user.name} 已断开连接")
 
     def getInfo(self, id, current=None):
@@ -73,61 +69,59 @@ class AuthenticatorI(Murmur.ServerAuthenticator):
     def idToTexture(self, id, current=None):
         return []
 
+class ServerCallbackI(Murmur.ServerCallback):
+    """
+    用户连接、断开和切换频道的通知由服务器回调发出（认证器本身收不到），转给认证器的会话表
+    """
+    def __init__(self, authenticator):
+        self.authenticator = authenticator
+
+    def userConnected(self, user, current=None):
+        self.authenticator.userConnected(user)
+
+    def userDisconnected(self, user, current=None):
+        self.authenticator.userDisconnected(user)
+
+    def userStateChanged(self, user, current=None):
+        self.authenticator.online_users.move(user.session, user.channel)
+
+    def userTextMessage(self, user, message, current=None):
+        pass
+
+    def channelCreated(self, channel, current=None):
+        pass
+
+    def channelRemoved(self, channel, current=None):
+        pass
+
+    def channelStateChanged(self, channel, current=None):
+        pass
+
 url = "https://airwaysn.org/api/v1/public/auth"
+# 客户端断线后会自动重连，服务器重启时大量客户端同时认证，缓存认证结果避免每次都请求上游
+auth_cache = AuthCache()
+auth_backend = AuthBackend(url, auth_cache)
+STATS_INTERVAL = 100  # 每多少次认证打印一次缓存统计
+
 def login(cid, password):
-    global url
-    # url = "https://airwaysn.org/api/v1/public/auth"
-    headers = {
-        "Content-Type": "application/json",
-    }
-    data = {
-        "cid": str(cid),
-        "password": str(password),
-    }
-    print(f"登录请求: {data}")
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        if response.status_code == 200:
-            print (f"登录成功: {response.status_code}, {response.text}")
-            return True
-        
-        else:
-            print (f"登录失败: {response.status_code}, {response.text}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"请求错误: {e}")
-        return False
+    return auth_backend.verify(cid, password)
     
-def login_ATIS(cid, password):
+def login_ATIS(username, password):
     # ATIS登录逻辑，ATIS登录时遵循用户名：DDDD_atisDDDDDD的格式
-    print(f"ATIS登录: {cid}, {password}")
-    # 获取真正的用户ID（ATIS前面的数字）
-    cid = cid.split("_atis")[0]
+    # username可以是用户名字符串，也可以是authenticate中已经解析好的结果
+    if isinstance(username, str):
+        username = parse_username(username)
+    if username.kind != ATIS:
+        return False
+    # 真正的用户ID（ATIS前面的数字）
+    cid = username.cid
+    print(f"ATIS登录: {cid}, 频率 {username.frequency}")
     
     # 特殊处理ID
     if cid == "900" and password == "p@ssw0rd":
         return True
     
-    headers = {
-        "Content-Type": "application/json",
-    }
-    data = {
-        "cid": str(cid),
-        "password": str(password),
-    }
-    print(f"登录请求: {data}")
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        if response.status_code == 200:
-            print (f"ATIS登录成功: {response.status_code}, {response.text}")
-            return True
-        
-        else:
-            print (f"登录失败: {response.status_code}, {response.text}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"请求错误: {e}")
-        return False
+    return auth_backend.verify(cid, password)
 
 
 
@@ -136,6 +130,9 @@ def main():
     init_data = Ice.InitializationData()
     init_data.properties = Ice.createProperties()
     init_data.properties.setProperty("Ice.Default.EncodingVersion", "1.0")
+    # 默认只有一个派发线程，认证请求会排队；多个线程才能并发等待上游并合并相同CID的请求
+    init_data.properties.setProperty("Ice.ThreadPool.Server.Size", "4")
+    init_data.properties.setProperty("Ice.ThreadPool.Server.SizeMax", "16")
 
     with Ice.initialize(init_data) as communicator:
         # 设置Ice连接，强制代理使用 1.0 编码
@@ -168,6 +165,16 @@ def main():
         auth_prx = adapter.addWithUUID(auth)
         server_auth = Murmur.ServerAuthenticatorPrx.checkedCast(auth_prx)
 
+        # 注册服务器回调以跟踪在线用户，并登记认证器启动前已经在线的用户
+        callback = ServerCallbackI(auth)
+        callback_prx = Murmur.ServerCallbackPrx.checkedCast(adapter.addWithUUID(callback))
+        try:
+            server.addCallback(callback_prx, context)
+            for user in server.getUsers(context).values():
+                auth.userConnected(user)
+        except Ice.Exception as e:
+            print(f"注册服务器回调失败: {e}")
+
 
 
         # 设置认证器
@@ -185,6 +192,11 @@ def main():
                 server.setAuthenticator(None, context)
             except:
                 pass
+            try:
+                server.removeCallback(callback_prx, context)
+            except:
+                pass
+            auth.online_users.shutdown()
 
 if __name__ == "__main__":
     main()
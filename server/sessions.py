@@ -0,0 +1,158 @@
+import threading
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from username import INVALID, parse_username
+
+Session = namedtuple("Session", ["session", "name", "cid", "kind", "channel"])
+
+
+def describe_name(name):
+    """用户名对应的(CID, 类型)；不符合格式的用户名（如SuperUser）以用户名本身作为CID"""
+    parsed = parse_username(name)
+    if parsed.kind == INVALID:
+        return name, INVALID
+    return parsed.cid, parsed.kind
+
+
+class SessionRegistry:
+    """
+    线程安全的在线会话表，Ice派发线程并发调用
+    按session保存会话，另有用户名索引（用于重复登录踢出）和CID索引
+    （同一CID可以同时有自己的连接和多个ATIS连接）；
+    踢出旧会话在后台线程中执行，认证不用等待kickUser返回
+    """
+
+    def __init__(self, serverprx=None, kick_workers=2):
+        self.serverprx = serverprx
+        self._sessions = {}  # session -> Session
+        self._by_name = {}  # 用户名 -> session
+        self._by_cid = {}  # CID -> {session}
+        self._lock = threading.Lock()
+        self._kicker = ThreadPoolExecutor(max_workers=kick_workers, thread_name_prefix="kick")
+        self._pending = 0
+        self._kicking = set()  # 已提交、还没执行完的session，同时多次重连只踢一次
+        self._idle = threading.Condition(self._lock)
+        self.connects = 0
+        self.disconnects = 0
+        self.kicks_submitted = 0
+        self.kicks_done = 0
+        self.kicks_failed = 0
+
+    def add(self, session, name, channel=0):
+        """记录新连接；同名的旧记录被替换（旧连接随后会被踢出或自行断开）"""
+        cid, kind = describe_name(name)
+        entry = Session(session, name, cid, kind, channel)
+        with self._lock:
+            self._discard(session)
+            # 同名旧连接的断开回调可能还没到，它留在session表中直到真正断开，名称索引指向新连接
+            self._sessions[session] = entry
+            self._by_name[name] = session
+            self._by_cid.setdefault(cid, set()).add(session)
+            self.connects += 1
+        return entry
+
+    def remove(self, session):
+        """按session删除，断开回调晚于新连接到达时不会误删新会话"""
+        with self._lock:
+            if self._discard(session) is not None:
+                self.disconnects += 1
+
+    def _discard(self, session):
+        """从所有索引中删除session（调用方持有锁）"""
+        entry = self._sessions.pop(session, None)
+        if entry is None:
+            return None
+        if self._by_name.get(entry.name) == session:
+            del self._by_name[entry.name]
+        sessions = self._by_cid.get(entry.cid)
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del self._by_cid[entry.cid]
+        return entry
+
+    def move(self, session, channel):
+        """用户切换频道"""
+        with self._lock:
+            entry = self._sessions.get(session)
+            if entry is not None and entry.channel != channel:
+                self._sessions[session] = entry._replace(channel=channel)
+
+    def session_for(self, name):
+        with self._lock:
+            return self._by_name.get(name)
+
+    def sessions_for_cid(self, cid):
+        """某个CID的全部会话（本人和各ATIS）"""
+        with self._lock:
+            return [self._sessions[s] for s in self._by_cid.get(str(cid), ())]
+
+    def evict(self, name, reason="您的账号在其他位置登录"):
+        """
+        在后台踢出同名的已有会话，立即返回被踢的session（没有时返回None）
+        """
+        with self._lock:
+            session = self._by_name.get(name)
+            if session is None or session in self._kicking:
+                return session
+            self._kicking.add(session)
+            self._pending += 1
+            self.kicks_submitted += 1
+        self._kicker.submit(self._kick, session, reason)
+        return session
+
+    def _kick(self, session, reason):
+        try:
+            self.serverprx.kickUser(session, reason)
+            ok = True
+        except Exception as e:
+            # 用户可能已经自己断开了
+            print(f"踢出用户失败: {e}")
+            ok = False
+        with self._lock:
+            if ok:
+                self.kicks_done += 1
+            else:
+                self.kicks_failed += 1
+            self._kicking.discard(session)
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def wait_kicks(self, timeout=None):
+        """等待已提交的踢出全部完成，返回是否在超时前完成"""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def per_channel(self):
+        """各频道的在线人数"""
+        with self._lock:
+            return dict(Counter(entry.channel for entry in self._sessions.values()))
+
+    def per_kind(self):
+        """机组、ATIS和其他用户各自的在线数量"""
+        with self._lock:
+            return dict(Counter(entry.kind for entry in self._sessions.values()))
+
+    def stats(self):
+        with self._lock:
+            result = {
+                "online": len(self._sessions),
+                "connects": self.connects,
+                "disconnects": self.disconnects,
+                "kicks_submitted": self.kicks_submitted,
+                "kicks_done": self.kicks_done,
+                "kicks_failed": self.kicks_failed,
+                "kicks_pending": self._pending,
+            }
+        result["per_kind"] = self.per_kind()
+        result["per_channel"] = self.per_channel()
+        return result
+
+    def shutdown(self):
+        self._kicker.shutdown(wait=False)
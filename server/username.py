@@ -0,0 +1,121 @@
+import functools
+from collections import namedtuple
+
+PILOT = "pilot"
+ATIS = "atis"
+INVALID = "invalid"
+
+ATIS_SEPARATOR = "_atis"
+MAX_CID_DIGITS = 10
+FREQUENCY_DIGITS = 6
+# 合法用户名最长为 10位CID + "_atis" + 6位频率，更长的直接判为无效，解析时间与输入长度无关
+MAX_NAME_LENGTH = MAX_CID_DIGITS + len(ATIS_SEPARATOR) + FREQUENCY_DIGITS
+
+# kind: PILOT/ATIS/INVALID；cid: 登录用的CID（原样保留前导0）；
+# user_id: 返回给Murmur的用户ID（机组为CID，ATIS为频率）；frequency: ATIS的6位频率
+Username = namedtuple("Username", ["kind", "cid", "user_id", "frequency"])
+INVALID_NAME = Username(INVALID, None, -1, None)
+
+
+def _is_digits(text, max_digits):
+    # str.isdigit()也接受全角、阿拉伯文等数字，int()能转换但上游不认，只允许ASCII
+    return 0 < len(text) <= max_digits and text.isascii() and text.isdigit()
+
+
+def parse_username(name):
+    """
+    解析用户名，一次扫描：
+    纯数字为机组CID，DDDD_atisDDDDDD为ATIS（前面是所属管制员的CID，后面是6位频率），其他为无效
+    """
+    if not name or len(name) > MAX_NAME_LENGTH:
+        return INVALID_NAME
+    return _parse(name)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse(name):
+    # 长度已检查过，缓存的键最多21个字符；重连时同一用户名会反复解析，命中时不再分配
+    cid, separator, frequency = name.partition(ATIS_SEPARATOR)
+    if not _is_digits(cid, MAX_CID_DIGITS):
+        return INVALID_NAME
+    if not separator:
+        return Username(PILOT, cid, int(cid), None)
+    if len(frequency) != FREQUENCY_DIGITS or not _is_digits(frequency, FREQUENCY_DIGITS):
+        return INVALID_NAME
+    return Username(ATIS, cid, int(frequency), frequency)
+
+
+def benchmark(count=200000, fuzz=200000, seed=0):
+    """
+    与原来的正则+split解析比较耗时，包括构造的恶意长用户名；
+    并用随机用户名与参考正则做对照测试，返回(各输入的耗时, 不一致的用户名列表)
+    """
+    import random
+    import re
+    import time
+
+    legacy_pattern = r"^.*_atis\d{6}"
+
+    def legacy(name):
+        # 原实现：每次编译正则，多次split，int()失败靠异常
+        try:
+            if re.compile(legacy_pattern).match(name):
+                return int(name.split("_atis")[1])
+            return int(name)
+        except ValueError:
+            return -1
+
+    cases = {
+        "机组": "1234567",
+        "ATIS": "1234_atis118100",
+        "无效": "SuperUser",
+        "恶意长名(_atis)": "_atis" * 20000,
+        "恶意长名(数字)": "9" * 100000 + "_atis12345",
+        "恶意长名(下划线)": "_" * 100000,
+    }
+    timings = {}
+    for label, name in cases.items():
+        runs = count if len(name) < 100 else max(1, count // 1000)
+        start = time.perf_counter()
+        for _ in range(runs):
+            parse_username(name)
+        parsed = (time.perf_counter() - start) / runs
+        start = time.perf_counter()
+        for _ in range(runs):
+            legacy(name)
+        timings[label] = (parsed, (time.perf_counter() - start) / runs)
+
+    reference_pilot = re.compile(r"[0-9]{1,%d}" % MAX_CID_DIGITS)
+    reference_atis = re.compile(r"([0-9]{1,%d})_atis([0-9]{6})" % MAX_CID_DIGITS)
+    alphabet = "0123456789_atisx٣９ "
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(fuzz):
+        if rng.random() < 0.5:
+            # 大多是接近合法格式的变体，更容易覆盖边界
+            name = "".join(rng.choice("0123456789") for _ in range(rng.randint(0, 12)))
+            if rng.random() < 0.7:
+                name += "_atis" + "".join(rng.choice("0123456789") for _ in range(rng.randint(4, 8)))
+            if rng.random() < 0.3:
+                position = rng.randint(0, len(name))
+                name = name[:position] + rng.choice(alphabet) + name[position:]
+        else:
+            name = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        result = parse_username(name)
+        match = reference_atis.fullmatch(name)
+        if match:
+            expected = Username(ATIS, match.group(1), int(match.group(2)), match.group(2))
+        elif reference_pilot.fullmatch(name):
+            expected = Username(PILOT, name, int(name), None)
+        else:
+            expected = INVALID_NAME
+        if result != expected:
+            mismatches.append(name)
+    return timings, mismatches
+
+
+if __name__ == "__main__":
+    timings, mismatches = benchmark()
+    for label, (parsed, legacy) in timings.items():
+        print(f"{label:16s} 新解析 {parsed * 1e6:9.2f} us  原实现 {legacy * 1e6:12.2f} us")
+    print(f"对照测试不一致: {len(mismatches)} {mismatches[:10]}")
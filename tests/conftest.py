@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 各程序按自己的目录平铺导入模块，测试时把这些目录和仓库根目录（common包）加入搜索路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "server"), os.path.join(ROOT, "controller")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
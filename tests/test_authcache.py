@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+import authcache
+from authcache import AuthCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可以手动拨动的单调时钟"""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(authcache, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_positive_and_negative_ttl(clock):
+    cache = AuthCache(ttl=600.0, negative_ttl=30.0)
+    cache.put("1000", "good", True)
+    cache.put("2000", "bad", False)
+    assert cache.get("1000", "good") is True
+    assert cache.get("2000", "bad") is False
+    assert cache.get("1000", "other") is None
+
+    clock.value += 31
+    assert cache.get("2000", "bad") is None
+    assert cache.get("1000", "good") is True
+
+    clock.value += 600
+    assert cache.get("1000", "good") is None
+    assert cache.stats()["expired"] == 2
+
+
+def test_wrong_password_does_not_replace_valid_success(clock):
+    cache = AuthCache(ttl=600.0)
+    cache.put("1000", "good", True)
+    cache.put("1000", "guess", False)
+    assert cache.get("1000", "good") is True
+
+
+def test_stale_fallback(clock):
+    cache = AuthCache(ttl=600.0)
+    cache.put("1000", "good", True)
+    clock.value += 3600
+    assert cache.get("1000", "good") is None
+    assert cache.get_stale("1000", "good", max_age=6 * 3600)
+    assert not cache.get_stale("1000", "other", max_age=6 * 3600)
+    clock.value += 6 * 3600
+    assert not cache.get_stale("1000", "good", max_age=6 * 3600)
+
+
+def test_failure_after_ttl_keeps_verified_digest(clock):
+    cache = AuthCache(ttl=600.0, negative_ttl=30.0)
+    cache.put("1000", "good", True)
+    clock.value += 700
+    cache.put("1000", "guess", False)
+    assert cache.get("1000", "guess") is False
+    assert cache.get("1000", "good") is None
+    assert cache.get_stale("1000", "good", max_age=3600)
+
+
+def test_rejected_password_is_no_longer_a_fallback(clock):
+    cache = AuthCache(ttl=600.0)
+    cache.put("1000", "good", True)
+    clock.value += 700
+    cache.put("1000", "good", False)  # 密码已在别处修改
+    assert not cache.get_stale("1000", "good", max_age=3600)
+
+
+def test_lru_eviction(clock):
+    cache = AuthCache(max_entries=2)
+    cache.put("1", "a", True)
+    cache.put("2", "b", True)
+    cache.get("1", "a")
+    cache.put("3", "c", True)
+    assert cache.get("2", "b") is None
+    assert cache.get("1", "a") is True
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pytest
+
+import authbackend
+from authbackend import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(authbackend, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=3, reset_timeout=30.0, slow_threshold=2.0)
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record(False, 0.1)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    breaker.record(True, 0.1)  # 成功清零连续失败计数
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+    assert not breaker.allow()
+
+
+def test_slow_responses_count_as_failures(breaker):
+    for _ in range(3):
+        breaker.record(True, 2.5)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_allows_single_probe(breaker, clock):
+    trip(breaker)
+    clock.value += 29
+    assert not breaker.allow()
+    clock.value += 1
+    assert breaker.allow() == CircuitBreaker.PROBE
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_probe_success_closes(breaker, clock):
+    trip(breaker)
+    clock.value += 30
+    breaker.allow()
+    breaker.record(True, 0.1, probe=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() is True
+
+
+def test_probe_failure_reopens(breaker, clock):
+    trip(breaker)
+    clock.value += 30
+    breaker.allow()
+    breaker.record(False, 0.1, probe=True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.value += 30
+    assert breaker.allow() == CircuitBreaker.PROBE
+
+
+def test_late_results_do_not_release_probe(breaker, clock):
+    trip(breaker)
+    clock.value += 30
+    assert breaker.allow() == CircuitBreaker.PROBE
+    # 断开前发出的请求现在才返回，不能放行第二个试探请求，也不能决定半开状态
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
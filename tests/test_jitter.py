@@ -0,0 +1,70 @@
+import numpy as np
+
+from common.jitter import JitterBuffer
+
+FRAME = 960  # 20ms @ 48000Hz，占2个序列号
+
+
+def frame(value):
+    return np.full(FRAME, value, dtype=np.int16).tobytes()
+
+
+def play(buffer, frames):
+    """逐帧读取，返回每帧的第一个样本"""
+    out = np.zeros(FRAME, dtype=np.int16)
+    values = []
+    for _ in range(frames):
+        buffer.read_into(out)
+        values.append(int(out[0]))
+    return values
+
+
+def fill(buffer, sequences, values):
+    for sequence, value in zip(sequences, values):
+        # 到达时间与序列号一致，抖动估计为0
+        buffer.put(sequence, frame(value), arrival=100.0 + sequence * 0.01)
+
+
+def test_in_order():
+    buffer = JitterBuffer(robustness=1.0)
+    fill(buffer, [0, 2, 4, 6], [1, 2, 3, 4])
+    assert play(buffer, 5) == [1, 2, 3, 4, 0]
+    assert buffer.is_idle()
+
+
+def test_reorders_by_sequence():
+    buffer = JitterBuffer(robustness=1.0)
+    fill(buffer, [0, 4, 2, 6], [1, 3, 2, 4])
+    assert play(buffer, 4) == [1, 2, 3, 4]
+    assert buffer.stats()["concealed"] == 0
+
+
+def test_conceals_lost_frame_with_decayed_previous():
+    buffer = JitterBuffer(robustness=1.0)
+    fill(buffer, [0, 2, 6, 8], [1000, 2000, 4000, 5000])
+    assert play(buffer, 5) == [1000, 2000, 1000, 4000, 5000]
+    assert buffer.stats()["concealed"] == 1
+
+
+def test_long_loss_falls_back_to_silence():
+    buffer = JitterBuffer(robustness=1.0)
+    fill(buffer, [0, 2, 20], [1000, 2000, 3000])
+    values = play(buffer, 7)
+    assert values[:5] == [1000, 2000, 1000, 500, 250]
+    assert values[5:] == [0, 3000]
+
+
+def test_late_frame_is_dropped():
+    buffer = JitterBuffer(robustness=1.0)
+    fill(buffer, [0, 4, 6], [1, 3, 4])
+    play(buffer, 2)  # 序列号2已被补偿帧代替
+    buffer.put(2, frame(2), arrival=100.02)
+    assert play(buffer, 2) == [3, 4]
+    assert buffer.stats()["late"] == 1
+
+
+def test_deep_buffer_drops_oldest_to_catch_up():
+    buffer = JitterBuffer(robustness=0.0)  # 目标深度20ms，超过目标40ms后丢帧
+    fill(buffer, [0, 2, 4, 6], [1, 2, 3, 4])
+    assert play(buffer, 3) == [2, 3, 4]
+    assert buffer.stats()["discarded"] == 1
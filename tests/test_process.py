@@ -0,0 +1,42 @@
+import pytest
+
+from common.process import AtisNormalizer, process_mixed_atis_text, process_single_atis_text, spell_digits
+
+
+@pytest.mark.parametrize("text, is_chinese, expected", [
+    ("INFORMATION K RWY 35L WIND 03005G15KT QNH 1013", False,
+     "INFORMATION Kilo runway three five left wind zero three zero degrees five knots "
+     "gusting one five knots QNH one zero one three"),
+    ("A2992 VRB02MPS", False, "altimeter two niner niner two wind variable two meters per second"),
+    ("ZSSS ATIS 0830Z", False, "ZSSS ATIS zero eight three zero Z"),
+    ("RWY 35L 34R IN USE", False, "runway three five left three four right IN USE"),
+    ("跑道36R 风 34012KT 修正海压 Q1008", True, "跑道 三 六 右 风向 三 四 洞 度 风速 幺 两 节 修正海压 幺 洞 洞 八"),
+    ("情报通播 K 温度 18", True, "情报通播 Kilo 温度 幺 八"),
+])
+def test_single_language(text, is_chinese, expected):
+    assert process_single_atis_text(text, is_chinese).split() == expected.split()
+
+
+def test_mixed_text_splits_languages():
+    assert process_mixed_atis_text("RWY 01 | 跑道 01") == "runway zero one|跑道 洞 幺"
+
+
+def test_letters_inside_words_are_kept():
+    assert process_single_atis_text("CAVOK NOSIG") == "CAVOK NOSIG"
+
+
+def test_spell_digits():
+    assert spell_digits("09") == "zero niner"
+    assert spell_digits("17", is_chinese=True) == "幺 拐"
+
+
+def test_empty_text():
+    assert process_single_atis_text("") == ""
+
+
+def test_add_rule():
+    normalizer = AtisNormalizer()
+    normalizer.anchor += "|VIS"
+    normalizer.add_rule("visibility", r"\bVIS\s+(?P<meters>\d{4})\b",
+                        lambda match, is_chinese: f"visibility {match['meters']} meters")
+    assert normalizer.normalize("VIS 6000 BR") == "visibility six zero zero zero meters BR"
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from resample import Resampler, resample
+
+
+def tone(frequency, rate, samples, amplitude=10000):
+    return np.sin(2 * np.pi * frequency * np.arange(samples) / rate) * amplitude
+
+
+@pytest.mark.parametrize("src_rate, dst_rate", [(22050, 48000), (24000, 48000), (48000, 16000)])
+def test_tone_is_preserved(src_rate, dst_rate):
+    pcm = tone(1000.0, src_rate, src_rate // 2).astype(np.int16)
+    out = resample(pcm, src_rate, dst_rate)
+    assert out.dtype == np.int16
+    assert len(out) == round(len(pcm) * dst_rate / src_rate)
+    # 已补偿滤波器延迟，除去两端暖机部分后与理想正弦一致
+    ideal = tone(1000.0, dst_rate, len(out))
+    edge = dst_rate // 50
+    assert np.abs(out[edge:-edge] - ideal[edge:-edge]).max() < 20
+
+
+def test_same_rate_is_copy():
+    pcm = np.arange(100, dtype=np.int16)
+    assert np.array_equal(resample(pcm.tobytes(), 48000, 48000), pcm)
+
+
+def test_streaming_matches_whole():
+    pcm = tone(440.0, 22050, 22050).astype(np.int16)
+    resampler = Resampler(22050, 48000)
+    blocks = [resampler.process(pcm[i:i + 441]) for i in range(0, len(pcm), 441)]
+    blocks.append(resampler.flush())
+    whole = resample(pcm, 22050, 48000)
+    streamed = np.concatenate(blocks)[resampler.delay:resampler.delay + len(whole)]
+    assert np.array_equal(streamed, whole)
+
+
+def test_clipping():
+    pcm = np.full(4800, 32767, dtype=np.int16)
+    pcm[::2] = -32768  # 奈奎斯特频率的满幅方波，滤波后不能溢出int16
+    out = resample(pcm, 48000, 44100)
+    assert out.min() >= -32768 and out.max() <= 32767
@@ -0,0 +1,34 @@
+import pytest
+
+from username import ATIS, INVALID_NAME, MAX_NAME_LENGTH, PILOT, Username, parse_username
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("1234567", Username(PILOT, "1234567", 1234567, None)),
+    ("0012", Username(PILOT, "0012", 12, None)),
+    ("1234_atis118100", Username(ATIS, "1234", 118100, "118100")),
+    ("1234_atis012500", Username(ATIS, "1234", 12500, "012500")),
+])
+def test_valid_names(name, expected):
+    assert parse_username(name) == expected
+
+
+@pytest.mark.parametrize("name", [
+    "",
+    "SuperUser",
+    "_atis118100",  # 缺少CID
+    "1234_atis11810",  # 频率不足6位
+    "1234_atis1181000",
+    "1234_atis118100x",
+    "12345678901",  # CID超过10位
+    "１２３４",  # 全角数字
+    "12 34",
+    "1234_ATIS118100",
+])
+def test_invalid_names(name):
+    assert parse_username(name) == INVALID_NAME
+
+
+def test_overlong_names_are_rejected_before_parsing():
+    assert parse_username("9" * (MAX_NAME_LENGTH + 1)) == INVALID_NAME
+    assert parse_username("_atis" * 20000) == INVALID_NAME